@@ -1,23 +1,92 @@
+import hashlib
+import json
 import os
 import sys
 from argparse import Namespace as argNamespace
-from collections import namedtuple
+from collections import deque, namedtuple
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Any, Generator
 
 sys.path.append(str(Path("./modules").resolve()))
 
-from flask import Flask, render_template
+from flask import Flask, Response, render_template, request
 
 from .modules.make_puzzles import make_puzzles
+from .puzzle_jobs import DEFAULT_PROCESSES, DEFAULT_QUEUE_LIMIT, DEFAULT_TIME_BUDGET, PoolSaturatedError, PuzzleJobs
+from .puzzle_pool import DEFAULT_DEPTH, DEFAULT_WORKERS, PuzzlePool
 
 DATA_PATH = "data"
+# a random search can run into a dead end, and is then tried again with another seed
+MAX_PUZZLE_ATTEMPTS = 10
+BATCH_MAX_COUNT = 500
+BATCH_MAX_SIZE = 40
+BATCH_CHUNK_SIZE = 20
+BATCH_MAX_AGE = 24 * 60 * 60
 
 PuzzleContext = namedtuple('PuzzleContext', ['words', 'width', 'height', 'puzzle'])
 
-puzzle_results:list[str] = []
 
-def puzzle_creation_callback(puzzle: list) -> None:
-    puzzle_results.extend([c for row in puzzle for c in row])
+class NoPuzzleError(RuntimeError):
+    """Raised when no puzzle can be made from a wordlist, as its words do not fit together in the grid."""
+
+
+def get_wordlist_path(wordlist:str|None) -> Path:
+    return Path(f"{DATA_PATH}/{str(wordlist)}.list")
+
+
+def create_puzzles(wordlist:str, count:int = 1, width:int|None = None, height:int|None = None, seed:str|None = None, start:int = 0) -> list[PuzzleContext]:
+    """Make new puzzles from a wordlist file. Each puzzle is collected in its own list, so puzzles made at the
+    same time by different threads do not mix.
+    count:          number of puzzles to make.
+    width:          grid width, by default 4 more than the longest word.
+    height:         grid height, by default 2 more than the longest word.
+    seed:           if given, puzzle number n is made from the seed and n, so the same puzzles are made again for the
+                    same seed, however a batch is split between jobs.
+    start:          number of the first puzzle, for seeding."""
+    with open(get_wordlist_path(wordlist)) as fp:
+        listdata = [l.strip() for l in fp.readlines() if l]
+    longest = 0
+    for word in listdata:
+        if len(word) > longest:
+            longest = len(word)
+    width = max(longest, width or longest + 4)
+    height = max(longest, height or longest + 2)
+    puzzles = []
+    for puzzle_ndx in range(start, start + count):
+        for attempt in range(MAX_PUZZLE_ATTEMPTS):
+            args = argNamespace(width=width, height=height, placeholder='*', seed=None if seed is None else f"{seed}:{puzzle_ndx}:{attempt}")
+            puzzle_results:list[str] = []
+            def puzzle_creation_callback(puzzle: list) -> None:
+                puzzle_results.extend([c for row in puzzle for c in row])
+            make_puzzles(args=args, wordlist=listdata, new_puzzle_callback=puzzle_creation_callback)
+            if puzzle_results:
+                puzzles.append(PuzzleContext(tuple(listdata), width, height, tuple(puzzle_results)))
+                break
+        else:
+            raise NoPuzzleError(f"no puzzle could be made from wordlist '{wordlist}' in a {width}x{height} grid.")
+    return puzzles
+
+
+def get_batch_etag(wordlist:str, count:int, width:int|None, height:int|None, seed:str) -> str:
+    """Seeded batches are always the same for the same wordlist and parameters, so they are tagged by them."""
+    with open(get_wordlist_path(wordlist), 'rb') as fp:
+        digest = hashlib.sha256(fp.read())
+    digest.update(f"{count}:{width}:{height}:{seed}".encode())
+    return digest.hexdigest()[:32]
+
+
+def get_batch_error_message(error:Exception) -> str:
+    if isinstance(error, PoolSaturatedError):
+        return "too many puzzles are being made, try again shortly."
+    if isinstance(error, TimeoutError):
+        return "puzzles could not be made in time."
+    return f"puzzles could not be made: {error}"
+
+
+def puzzle_to_json_line(context:PuzzleContext) -> str:
+    rows = ["".join(context.puzzle[y * context.width:(y + 1) * context.width]) for y in range(context.height)]
+    return json.dumps({'words': context.words, 'width': context.width, 'height': context.height, 'rows': rows}) + "\n"
 
 
 def create_app(test_config=None):
@@ -29,6 +98,17 @@ def create_app(test_config=None):
         ## load the test config if passed in
         app.config.from_mapping(test_config)
 
+    # puzzles are made in separate processes, ahead of requests, and kept ready for every wordlist
+    processes = app.config.get('PUZZLE_PROCESSES', DEFAULT_PROCESSES)
+    puzzle_jobs = PuzzleJobs(create_puzzles, processes, app.config.get('PUZZLE_QUEUE_LIMIT', DEFAULT_QUEUE_LIMIT))
+    time_budget = app.config.get('PUZZLE_TIME_BUDGET', DEFAULT_TIME_BUDGET)
+    puzzle_pool = PuzzlePool(lambda wordlist: puzzle_jobs.submit(wordlist).result()[0], app.config.get('PUZZLE_POOL_DEPTH', DEFAULT_DEPTH), app.config.get('PUZZLE_POOL_WORKERS', DEFAULT_WORKERS))
+    for name in os.listdir(DATA_PATH):
+        if name.endswith('.list'):
+            puzzle_pool.add(name.rsplit('.', 1)[0])
+    app.extensions['puzzle_pool'] = puzzle_pool
+    app.extensions['puzzle_jobs'] = puzzle_jobs
+
     @app.get('/')
     def index():
         wordlist_names = [n.split('.', 1)[0] for n in os.listdir(DATA_PATH) if n]
@@ -38,22 +118,108 @@ def create_app(test_config=None):
     def api():
         return render_template("api-help.html")
 
+    @app.get('/api/metrics/')
+    def metrics():
+        return {'pool': puzzle_pool.stats(), 'jobs': puzzle_jobs.stats()}
+
     @app.get('/api/v1/<wordlist>/')
     def load_puzzle(wordlist:str|None=None):
-        puzzle_results.clear()
-        wordlist_path = Path(f"{DATA_PATH}/{str(wordlist)}.list")
-        if wordlist is None or not wordlist_path.exists():
+        if wordlist is None or not get_wordlist_path(wordlist).exists():
             return render_template("puzzle-404.html", wordlist=wordlist)
-        with open(wordlist_path) as fp:
-            listdata = [l.strip() for l in fp.readlines() if l]
-        longest = 0
-        for word in listdata:
-            if len(word) > longest:
-                longest = len(word)
-        args = argNamespace(width=longest + 4, height=longest + 2, placeholder='*')
-        make_puzzles(args=args, wordlist=listdata, new_puzzle_callback=puzzle_creation_callback)
-        context = PuzzleContext(tuple(listdata), args.width, args.height, tuple(puzzle_results))
+        context = puzzle_pool.get(wordlist)
+        if context is None:
+            try:
+                context = puzzle_jobs.generate(wordlist, time_budget)[0]
+            except PoolSaturatedError:
+                return render_template("puzzle-503.html", wordlist=wordlist, reason="too many puzzles are being made at once"), 503, {'Retry-After': '1'}
+            except TimeoutError:
+                return render_template("puzzle-503.html", wordlist=wordlist, reason="it could not be made in time"), 503, {'Retry-After': '1'}
+            except NoPuzzleError:
+                return render_template("puzzle-422.html", wordlist=wordlist), 422
 
         return render_template("puzzle.html", puzzle_context=context)
 
+    @app.get('/api/v1/<wordlist>/batch/')
+    def load_puzzle_batch(wordlist:str):
+        if not get_wordlist_path(wordlist).exists():
+            return {'error': f"the wordlist '{wordlist}' could not be found."}, 404
+        try:
+            count = int(request.args.get('count', 1))
+            width = int(request.args['width']) if 'width' in request.args else None
+            height = int(request.args['height']) if 'height' in request.args else None
+        except ValueError:
+            return {'error': "count, width and height must be whole numbers."}, 400
+        max_count = app.config.get('BATCH_MAX_COUNT', BATCH_MAX_COUNT)
+        if not 1 <= count <= max_count:
+            return {'error': f"count must be from 1 to {max_count}."}, 400
+        if any([size is not None and not 1 <= size <= BATCH_MAX_SIZE for size in (width, height)]):
+            return {'error': f"width and height must be from 1 to {BATCH_MAX_SIZE}."}, 400
+        seed = request.args.get('seed')
+
+        # seeded batches can be cached, and are not made again for a request with a matching ETag
+        etag = None
+        if seed is not None:
+            etag = get_batch_etag(wordlist, count, width, height, seed)
+            headers = {'Cache-Control': f"public, max-age={app.config.get('BATCH_MAX_AGE', BATCH_MAX_AGE)}"}
+            if request.if_none_match.contains(etag):
+                response = Response(status=304, headers=headers)
+                response.set_etag(etag)
+                return response
+
+        # batch jobs count against the queue limit, so many batches at once can not queue work without bound
+        starts = range(0, count, BATCH_CHUNK_SIZE)
+        def submit_chunk(start:int) -> Future:
+            return puzzle_jobs.submit(wordlist, min(BATCH_CHUNK_SIZE, count - start), width, height, seed, start, limited=True)
+        try:
+            first_job = submit_chunk(starts[0])
+        except PoolSaturatedError as error:
+            return {'error': get_batch_error_message(error)}, 503, {'Retry-After': '1', 'Cache-Control': 'no-store'}
+
+        def make_chunks() -> Generator[list[PuzzleContext], Any, None]:
+            """Puzzles are made in chunks, one job per process at a time, and given in order as each chunk is done.
+            Raises TimeoutError if a chunk is not done in time, PoolSaturatedError if the queue limit is reached with
+            no chunk of the batch queued, or the error of a job which failed."""
+            next_start_ndx = 1
+            pending:deque[Future] = deque([first_job])
+            try:
+                while next_start_ndx < len(starts) or pending:
+                    while next_start_ndx < len(starts) and len(pending) < processes:
+                        try:
+                            pending.append(submit_chunk(starts[next_start_ndx]))
+                        except PoolSaturatedError:
+                            # wait for the chunks already queued, before trying to queue more
+                            if pending:
+                                break
+                            raise
+                        next_start_ndx += 1
+                    yield pending.popleft().result(time_budget)
+            finally:
+                # also stops the remaining jobs if the client goes away, or a chunk fails
+                for future in pending:
+                    future.cancel()
+
+        if seed is None:
+            def stream() -> Generator[str, Any, None]:
+                """Puzzles are sent while they are made, and a failed chunk ends the batch with an error line."""
+                try:
+                    for puzzles in make_chunks():
+                        for context in puzzles:
+                            yield puzzle_to_json_line(context)
+                except Exception as error:
+                    yield json.dumps({'error': get_batch_error_message(error)}) + "\n"
+            return Response(stream(), mimetype='application/x-ndjson', headers={'Cache-Control': 'no-store'})
+
+        # a seeded batch is only sent once every puzzle is made, so a failed batch is never cached under its ETag
+        try:
+            lines = [puzzle_to_json_line(context) for puzzles in make_chunks() for context in puzzles]
+        except (TimeoutError, PoolSaturatedError) as error:
+            return {'error': get_batch_error_message(error)}, 503, {'Retry-After': '1', 'Cache-Control': 'no-store'}
+        except NoPuzzleError as error:
+            return {'error': get_batch_error_message(error)}, 422, {'Cache-Control': 'no-store'}
+        except Exception as error:
+            return {'error': get_batch_error_message(error)}, 500, {'Cache-Control': 'no-store'}
+        response = Response(lines, mimetype='application/x-ndjson', headers=headers)
+        response.set_etag(etag)
+        return response
+
     return app
@@ -2,9 +2,8 @@
 import argparse
 from decimal import Decimal, getcontext
 from functools import partial
-from random import choice, seed
+from random import Random
 from string import ascii_lowercase
-from time import time
 from typing import Any, Callable, Generator
 
 import data_converters
@@ -16,7 +15,7 @@ DECIMAL_ADJUSTMENT_FACTOR = Decimal(0.008)
 END_NODE = "END"
 
 
-reseed = lambda _=0: seed(time())
+default_rng = Random()
 
 
 def make_validator_check_overlapping_words(data_converter:Callable[[tuple[Position, Direction, str]], dict[Position, str]]):
@@ -32,7 +31,7 @@ def make_validator_check_overlapping_words(data_converter:Callable[[tuple[Positi
     return validator_func
 
 
-def make_candidates_generator_factory(directions:tuple[Direction, ...], width:int, height:int):
+def make_candidates_generator_factory(directions:tuple[Direction, ...], width:int, height:int, rng:Random = default_rng):
     def word_candidates_gen(word:str) -> Generator[list[tuple], Any, None]:
         """Generator function to create valid placements and directions of a given word in a hypothetical grid.
         Returns:    list[
@@ -40,12 +39,12 @@ def make_candidates_generator_factory(directions:tuple[Direction, ...], width:in
                             [d, ...]    immutable sequence of directions
         ]"""
         word_len = len(word)
-        reseed()
         items:list =[((x,y), tuple([d for d in directions if 0 <= x + d.value[0] * (word_len - 1) < width and 0 <= y + d.value[1] * (word_len - 1) < height]),) for y in range(height) for x in range(width)]
+        # draw without replacement, by swapping the drawn item with the last one and popping it
         while items:
-            i = choice(items)
-            items.remove(i)
-            yield i
+            j = rng.randrange(len(items))
+            items[j], items[-1] = items[-1], items[j]
+            yield items.pop()
     return word_candidates_gen
 
 
@@ -85,19 +84,19 @@ def find_word_candidates(new_word:str, existing_letters_data:dict, validators:tu
     return candidates
 
 
-def random_fill_puzzle_grid(grid:tuple, placeholder = str) -> tuple:
+def random_fill_puzzle_grid(grid:tuple, placeholder = str, rng:Random = default_rng) -> tuple:
     """Replaces empty grid places with random letters."""
     tmp_ = [[char for char in row] for row in grid]
     for j in range(len(tmp_)):
         row = tmp_[j]
         for i in range(len(row)):
             if row[i] == placeholder:
-                row[i] = choice(ascii_lowercase)
+                row[i] = rng.choice(ascii_lowercase)
     grid = tuple([tuple(row) for row in tmp_])
     return grid
 
 
-def send_puzzles_to_callback(start_nodes:list[LinkedListItemSingleLink]|set[LinkedListItemSingleLink], writer_func:Callable, grid_width:int, grid_height:int, placeholder) -> None:
+def send_puzzles_to_callback(start_nodes:list[LinkedListItemSingleLink]|set[LinkedListItemSingleLink], writer_func:Callable, grid_width:int, grid_height:int, placeholder, rng:Random = default_rng) -> None:
     """Given a set of starting nodes for puzzle combinations, generate each puzzle then send it to
     a file writer callback.
     start_nodes:            collection of LinkedList nodes to start from.
@@ -105,7 +104,8 @@ def send_puzzles_to_callback(start_nodes:list[LinkedListItemSingleLink]|set[Link
     adapter_func:           function to convert from LinkedList data to data used by puzzle Grid.
     grid_width:             width of puzzle grid, in letters.
     grid_height:            height of puzzle grid, in letters.
-    placeholder:            placeholder character used by incomplete grids."""
+    placeholder:            placeholder character used by incomplete grids.
+    rng:                    random number generator for the letters filling the grid."""
 
     for node in start_nodes:
         char_positions = dict(node.data)
@@ -114,7 +114,7 @@ def send_puzzles_to_callback(start_nodes:list[LinkedListItemSingleLink]|set[Link
             char_positions.update(prev_link.data)
             prev_link = prev_link.link
         grid:tuple = data_converters.char_position_to_letter_grid_converter(char_positions, grid_width, grid_height, placeholder)
-        grid = random_fill_puzzle_grid(grid, placeholder=placeholder)
+        grid = random_fill_puzzle_grid(grid, placeholder=placeholder, rng=rng)
         str_rows = tuple(["".join(row) for row in grid])
         writer_func(str_rows)
 
@@ -175,9 +175,12 @@ def recurse_update_linked_list(prev_item:LinkedListItemSingleLink, next_word_ndx
 
 def make_puzzles(args:argparse.Namespace, wordlist:list[str], new_puzzle_callback:Callable) -> None:
     """Main function.
-    args:                   command line arguments object.
+    args:                   command line arguments object. If args.seed is set, the puzzle is made from a random
+                            number generator with that seed, so the same puzzle is made again for the same seed.
     new_puzzle_callback:    callback function for when new puzzles are found."""
     wlist = sorted(wordlist, key=lambda x: len(x), reverse=True)
+    seed = getattr(args, 'seed', None)
+    rng = Random(seed) if seed is not None else default_rng
     greatest_length = len(wlist[0])
 
     if args.width is None:
@@ -196,9 +199,9 @@ def make_puzzles(args:argparse.Namespace, wordlist:list[str], new_puzzle_callbac
 
     converter_ = data_converters.make_word_placement_to_char_position_converter()
     validator_non_overlapping = make_validator_check_overlapping_words(converter_)
-    generator_factory_ = make_candidates_generator_factory(directions=tuple([d for d in Direction]), width=WORD_SEARCH_WIDTH, height=WORD_SEARCH_HEIGHT)
+    generator_factory_ = make_candidates_generator_factory(directions=tuple([d for d in Direction]), width=WORD_SEARCH_WIDTH, height=WORD_SEARCH_HEIGHT, rng=rng)
     get_word_candidates = partial(find_word_candidates, validators=(validator_non_overlapping,), generator_factory=generator_factory_)
-    puzzle_writer_ = partial(send_puzzles_to_callback, writer_func=new_puzzle_callback, grid_width=WORD_SEARCH_WIDTH, grid_height=WORD_SEARCH_HEIGHT, placeholder=args.placeholder)
+    puzzle_writer_ = partial(send_puzzles_to_callback, writer_func=new_puzzle_callback, grid_width=WORD_SEARCH_WIDTH, grid_height=WORD_SEARCH_HEIGHT, placeholder=args.placeholder, rng=rng)
     recurse_create_puzzles = partial(recurse_update_linked_list, candidates_func=get_word_candidates, converter_func=converter_, directions=tuple([d for d in Direction]), end_state_callback_func=puzzle_writer_)
 
     ending_node = LinkedListItemSingleLink(END_NODE, None)
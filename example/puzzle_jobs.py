@@ -0,0 +1,97 @@
+import multiprocessing as mp
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+DEFAULT_PROCESSES = 2
+DEFAULT_QUEUE_LIMIT = 16
+DEFAULT_TIME_BUDGET = 5.0
+
+
+class PoolSaturatedError(Exception):
+    """Raised when too many puzzle generation jobs are already waiting or running."""
+
+
+class PuzzleJobs:
+    """Runs puzzle generation in a bounded pool of processes, so slow wordlists do not hold up request threads
+    or, through the GIL, the rest of the app. Concurrent requests for the same wordlist share one job."""
+
+    def __init__(self, generate_func:Callable[[str], Any], processes:int = DEFAULT_PROCESSES, queue_limit:int = DEFAULT_QUEUE_LIMIT) -> None:
+        """generate_func:  module level function which makes new puzzles for a wordlist name, run in the processes.
+        processes:      number of processes to make puzzles with.
+        queue_limit:    number of jobs which may be waiting or running at once, before request and batch jobs are refused."""
+        self._generate_func = generate_func
+        self._queue_limit = queue_limit
+        self._executor = ProcessPoolExecutor(max_workers=max(1, processes), mp_context=mp.get_context('spawn'))
+        # reentrant, as a done callback runs straight away in the calling thread if its job has already finished
+        self._lock = threading.RLock()
+        self._request_jobs:dict[str, Future] = {}
+        self._queued = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def submit(self, wordlist:str, *args, limited:bool = False) -> Future:
+        """Submit a job to make puzzles. Any args are passed on to the generate function, after the wordlist name.
+        If limited, as for batches of puzzles, raises PoolSaturatedError if the queue limit is reached. Otherwise the
+        job is always queued, as for refilling puzzle pools, which are bounded by their own number of threads."""
+        with self._lock:
+            if limited:
+                self._check_queue_limit()
+            return self._submit(wordlist, *args)
+
+    def generate(self, wordlist:str, timeout:float|None = DEFAULT_TIME_BUDGET) -> Any:
+        """Make a puzzle for a request, and wait up to timeout seconds for it. A job already running for the same
+        wordlist is shared, rather than starting another.
+        Raises PoolSaturatedError if the queue limit is reached, or TimeoutError if the time budget runs out. The
+        job carries on after a timeout, and later requests for the wordlist can still share it."""
+        with self._lock:
+            future = self._request_jobs.get(wordlist)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self._check_queue_limit()
+                future = self._submit(wordlist)
+                self._request_jobs[wordlist] = future
+                future.add_done_callback(partial(self._request_job_done, wordlist))
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def stats(self) -> dict:
+        """Returns the jobs submitted, running or waiting, shared by concurrent requests, refused by the queue limit,
+        and requests which ran out of time."""
+        with self._lock:
+            return {'submitted': self.submitted, 'queued': self._queued, 'coalesced': self.coalesced,
+                    'rejected': self.rejected, 'timeouts': self.timeouts, 'queue_limit': self._queue_limit}
+
+    def shutdown(self) -> None:
+        """Stop the processes, cancelling any jobs which have not started."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _check_queue_limit(self) -> None:
+        """Raises PoolSaturatedError if the jobs waiting or running, of every kind, have reached the queue limit."""
+        if self._queued >= self._queue_limit:
+            self.rejected += 1
+            raise PoolSaturatedError(f"{self._queued} puzzle jobs are already queued.")
+
+    def _submit(self, wordlist:str, *args) -> Future:
+        future = self._executor.submit(self._generate_func, wordlist, *args)
+        self._queued += 1
+        self.submitted += 1
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, _:Future) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def _request_job_done(self, wordlist:str, future:Future) -> None:
+        with self._lock:
+            if self._request_jobs.get(wordlist) is future:
+                del self._request_jobs[wordlist]
@@ -0,0 +1,99 @@
+import threading
+from collections import deque
+from typing import Any, Callable
+
+DEFAULT_DEPTH = 8
+DEFAULT_WORKERS = 1
+
+
+class PuzzlePool:
+    """Pools of ready made puzzles, one per wordlist, which background threads keep topped up to a target depth.
+    Requests only take a ready puzzle from the pool, so they do not wait for puzzle generation unless the pool
+    has run dry. All state is guarded by one lock, so the pool can be shared between request threads."""
+
+    def __init__(self, generate_func:Callable[[str], Any], depth:int = DEFAULT_DEPTH, workers:int = DEFAULT_WORKERS) -> None:
+        """generate_func:  function which makes a new puzzle for a wordlist name, called by the background threads.
+        depth:          number of puzzles to keep ready for each wordlist.
+        workers:        number of background threads which refill the pools. If 0, puzzles are only made on request."""
+        self._generate_func = generate_func
+        self._depth = max(0, depth)
+        self._pools:dict[str, deque] = {}
+        self._pending:dict[str, int] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.errors = 0
+        self._threads = [threading.Thread(target=self._refill, name=f"puzzle-pool-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def add(self, wordlist:str) -> None:
+        """Start keeping puzzles ready for a wordlist, such as when prewarming the pool at start up."""
+        with self._condition:
+            self._pools.setdefault(wordlist, deque())
+            self._pending.setdefault(wordlist, 0)
+            self._condition.notify_all()
+
+    def get(self, wordlist:str) -> Any|None:
+        """Take a ready puzzle for a wordlist, or None if there is none, for the caller to make one another way.
+        After a miss, the wordlist is added to the pool to be refilled."""
+        with self._condition:
+            pool = self._pools.get(wordlist)
+            if pool:
+                self.hits += 1
+                puzzle = pool.popleft()
+                self._condition.notify()
+                return puzzle
+            self.misses += 1
+        self.add(wordlist)
+        return None
+
+    def stats(self) -> dict:
+        """Returns the pool hits, misses, puzzles generated in the background, generation errors, and the number of
+        ready puzzles for each wordlist."""
+        with self._condition:
+            return {'hits': self.hits, 'misses': self.misses, 'generated': self.generated, 'errors': self.errors,
+                    'depth': self._depth, 'ready': {wordlist: len(pool) for wordlist, pool in self._pools.items()}}
+
+    def stop(self) -> None:
+        """Stop the background threads, after any puzzles they are making."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _next_wordlist(self) -> str|None:
+        """The wordlist furthest below the target depth, counting puzzles already being made, or None if all are full."""
+        shortfalls = [(self._depth - len(pool) - self._pending[wordlist], wordlist) for wordlist, pool in self._pools.items()]
+        shortfall, wordlist = max(shortfalls, default=(0, None))
+        return wordlist if shortfall > 0 else None
+
+    def _refill(self) -> None:
+        """Thread function, which makes puzzles for the pools below the target depth, and waits while all are full."""
+        while True:
+            with self._condition:
+                wordlist = self._next_wordlist()
+                while wordlist is None and not self._stopped:
+                    self._condition.wait()
+                    wordlist = self._next_wordlist()
+                if self._stopped:
+                    return
+                self._pending[wordlist] += 1
+            try:
+                puzzle = self._generate_func(wordlist)
+            except Exception:
+                puzzle = None
+            with self._condition:
+                if wordlist in self._pending:
+                    self._pending[wordlist] -= 1
+                if puzzle is None:
+                    # stop refilling a wordlist which can not be made, such as one which was removed
+                    self.errors += 1
+                    self._pools.pop(wordlist, None)
+                    self._pending.pop(wordlist, None)
+                elif wordlist in self._pools:
+                    self._pools[wordlist].append(puzzle)
+                    self.generated += 1
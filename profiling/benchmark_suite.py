@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+from datetime import datetime, timezone
+from time import perf_counter
+
+cwd = os.getcwd()
+if "profiling" in cwd:
+    raise RuntimeError("ERROR: This should be executed from the base project directory as 'python profiling/benchmark_suite.py'")
+sys.path.append(os.path.join(os.getcwd(), "src"))
+
+try:
+    import make_puzzles
+    import scenarios
+    from search_metrics import SearchMetrics
+except ImportError:
+    raise ImportError("Could not import make_puzzles module - are you in the base project directory?")
+
+INPUT_FILENAME = os.path.join("testing", "test_wordlist.txt")
+INPUT_FILENAME_COMPLEX = os.path.join("testing", "test_wordlist_complex.txt")
+DEFAULT_OUTPUT_FILE = os.path.join("profiling", "benchmark_results.json")
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.10
+PERCENTILES = (50, 90, 95)
+SEED = 1234
+
+with open(INPUT_FILENAME) as fp:
+    WORDLIST = [w for w in fp.read().split('\n') if w]
+with open(INPUT_FILENAME_COMPLEX) as fp:
+    WORDLIST_COMPLEX = [w for w in fp.read().split('\n') if w]
+
+
+def scenario_settings(scenario:scenarios.Scenario) -> dict:
+    return {'wordlist': scenario.wordlist, 'width': scenario.width, 'height': scenario.height}
+
+
+# every case changes one setting of the base case, so each sweep shows how the run time scales with that setting
+BASE_CASE = {'wordlist': WORDLIST_COMPLEX, 'width': 16, 'height': 16, 'puzzle_count': 100, 'create_all': False,
+             'sequential': True, 'search_engine': 'recursive', 'grid_engine': 'dict'}
+SWEEPS = {
+    'word_count': [(f"{n}_words", {'wordlist': WORDLIST_COMPLEX[:n]}) for n in (4, 8, 12, len(WORDLIST_COMPLEX))],
+    'word_length': [("short_words", {'wordlist': [w for w in WORDLIST_COMPLEX if len(w) <= 5]}),
+                    ("long_words", {'wordlist': [w for w in WORDLIST_COMPLEX if len(w) >= 7]})],
+    'grid_size': [(f"{size}x{size}", {'width': size, 'height': size}) for size in (12, 16, 24, 32)],
+    'order': [("sequential", {'sequential': True}), ("random", {'sequential': False})],
+    'mode': [("count_100", {}), ("count_1000", {'puzzle_count': 1000}),
+             ("create_all", {'wordlist': WORDLIST, 'width': 5, 'height': 5, 'create_all': True, 'search_engine': 'incremental'})],
+    # synthetic wordlists, up to the size of sold puzzles, and pathological cases, see src/scenarios.py
+    'synthetic_word_count': [(s.name, scenario_settings(s)) for s in scenarios.make_scaling_scenarios('product', 'count', [10, 20, 30, 40], SEED)],
+    'scenario': [(name, scenario_settings(scenarios.make_preset_scenario(name, SEED))) for name in ('long_words', 'crowded', 'high_overlap', 'few_letters')],
+}
+
+
+def get_cases(name_filter:str|None = None) -> list[tuple[str, dict]]:
+    """All benchmark cases, as (name, settings), optionally only those with name_filter in their name."""
+    cases = []
+    for sweep, variants in SWEEPS.items():
+        for variant, settings in variants:
+            name = f"{sweep}/{variant}"
+            if name_filter is None or name_filter in name:
+                cases.append((name, {**BASE_CASE, **settings}))
+    return cases
+
+
+def make_args(settings:dict) -> argparse.Namespace:
+    args = argparse.Namespace()
+    args.wordlist_file = None
+    args.output_filename = None
+    args.width = settings['width']
+    args.height = settings['height']
+    args.DEBUG = False
+    args.LOGGING = False
+    args.TIMED = False
+    args.create_all = settings['create_all']
+    args.placeholder = "*"
+    args.puzzle_count = settings['puzzle_count']
+    args.incomplete = True
+    args.sequential = settings['sequential']
+    args.seed = SEED
+    args.search_engine = settings['search_engine']
+    args.grid_engine = settings['grid_engine']
+    return args
+
+
+def run_once(settings:dict) -> tuple[float, int]:
+    """Run one case, returns the time in seconds and the number of puzzles made. Puzzles are counted, not kept."""
+    puzzle_count = 0
+    def count_puzzle(_) -> None:
+        nonlocal puzzle_count
+        puzzle_count += 1
+    args = make_args(settings)
+    start_time = perf_counter()
+    make_puzzles.make_puzzles(args, settings['wordlist'], count_puzzle)
+    return perf_counter() - start_time, puzzle_count
+
+
+def measure_search(settings:dict) -> SearchMetrics:
+    """Run one case with search metrics and memory tracing, which are too slow to include in the timed runs."""
+    metrics = SearchMetrics(trace_memory=True)
+    make_puzzles.make_puzzles(make_args(settings), settings['wordlist'], lambda _: None, metrics)
+    return metrics
+
+
+def percentile(timings:list[float], percent:int) -> float:
+    """Percentile of the timings, interpolated between the nearest two."""
+    ordered = sorted(timings)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_case(name:str, settings:dict, repeats:int) -> dict:
+    timings = []
+    puzzle_count = 0
+    for _ in range(repeats):
+        timing, puzzle_count = run_once(settings)
+        timings.append(timing)
+    metrics = measure_search(settings)
+    median = statistics.median(timings)
+    return {
+        'name': name,
+        'settings': {**{k: v for k, v in settings.items() if k != 'wordlist'}, 'word_count': len(settings['wordlist']),
+                     'word_lengths': sorted({len(w) for w in settings['wordlist']})},
+        'repeats': repeats,
+        'puzzles': puzzle_count,
+        'timings': {'min': min(timings), 'max': max(timings), 'mean': statistics.fmean(timings), 'median': median,
+                    **{f"p{p}": percentile(timings, p) for p in PERCENTILES}},
+        'nodes': metrics.total_nodes,
+        'nodes_per_second': metrics.total_nodes / median if median else 0.0,
+        'peak_memory_bytes': metrics.peak_memory,
+        'metrics': metrics.to_dict(),
+    }
+
+
+def run(output_filename:str, repeats:int, name_filter:str|None) -> None:
+    cases = get_cases(name_filter)
+    print(f"\n>>> BENCHMARK -> cases={len(cases)};  repeats={repeats}\n")
+    results = []
+    for name, settings in cases:
+        result = run_case(name, settings, repeats)
+        results.append(result)
+        timings = result['timings']
+        print(f"{name:>40}:  median={timings['median']:.3f}s  p90={timings['p90']:.3f}s  puzzles={result['puzzles']}  nodes/s={result['nodes_per_second']:.0f}  peak={result['peak_memory_bytes'] / 1024:.0f}KiB")
+    meta = {'created': datetime.now(timezone.utc).isoformat(), 'python': platform.python_version(),
+            'platform': platform.platform(), 'repeats': repeats, 'seed': SEED}
+    with open(output_filename, 'w') as fp:
+        json.dump({'meta': meta, 'cases': results}, fp, indent=2)
+    print(f"\nresults saved to {output_filename}")
+
+
+def compare(baseline_filename:str, results_filename:str, threshold:float) -> int:
+    """Compare the median timings and peak memory of two result files. Returns the number of regressions, cases
+    which are slower or use more memory than the baseline by more than threshold (as a fraction)."""
+    with open(baseline_filename) as fp:
+        baseline = {case['name']: case for case in json.load(fp)['cases']}
+    with open(results_filename) as fp:
+        results = json.load(fp)['cases']
+    regressions = 0
+    print(f"\n>>> COMPARE -> baseline={baseline_filename};  results={results_filename};  threshold={threshold:.0%}\n")
+    for case in results:
+        old = baseline.get(case['name'])
+        if old is None:
+            print(f"{case['name']:>40}:  new case")
+            continue
+        time_change = case['timings']['median'] / old['timings']['median'] - 1 if old['timings']['median'] else 0.0
+        memory_change = case['peak_memory_bytes'] / old['peak_memory_bytes'] - 1 if old['peak_memory_bytes'] else 0.0
+        flags = []
+        if time_change > threshold:
+            flags.append("SLOWER")
+        if memory_change > threshold:
+            flags.append("MORE MEMORY")
+        if case['puzzles'] != old['puzzles']:
+            flags.append("PUZZLE COUNT CHANGED")
+        regressions += bool(flags)
+        print(f"{case['name']:>40}:  median {old['timings']['median']:.3f}s -> {case['timings']['median']:.3f}s ({time_change:+.1%})  peak memory {memory_change:+.1%}  {' '.join(flags)}")
+    print(f"\n{regressions} regression(s) found.")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark puzzle generation over wordlist size, word length, grid size, order and mode.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="Run the benchmark cases, and save the results as JSON.")
+    run_parser.add_argument('-o', '--output_filename', default=DEFAULT_OUTPUT_FILE, help=f"JSON file to save the results to. Default is '{DEFAULT_OUTPUT_FILE}'.")
+    run_parser.add_argument('-r', '--repeats', type=int, default=DEFAULT_REPEATS, help=f"Number of timed runs of each case. Default is {DEFAULT_REPEATS}.")
+    run_parser.add_argument('-k', '--filter', help="Only run the cases with this text in their name, such as 'grid_size'.")
+    compare_parser = subparsers.add_parser('compare', help="Compare two result files, and flag regressions.")
+    compare_parser.add_argument('baseline_file')
+    compare_parser.add_argument('results_file')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD, help=f"Fraction by which a case may be slower, or use more memory, before it is a regression. Default is {DEFAULT_THRESHOLD}.")
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args.output_filename, max(1, args.repeats), args.filter)
+    else:
+        sys.exit(1 if compare(args.baseline_file, args.results_file, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,28 +4,28 @@ import os
 import sys
 
 cwd = os.getcwd()
-if "testing" in cwd:
-    raise RuntimeError("ERROR: This should be executed from the base project directory as 'python testing\\cProfile_script.py'")
-sys.path.append(os.getcwd())
+if "profiling" in cwd:
+    raise RuntimeError("ERROR: This should be executed from the base project directory as 'python profiling/cprofile_script.py'")
+sys.path.append(os.path.join(os.getcwd(), "src"))
 
 try:
     import make_puzzles
 except ImportError:
     raise ImportError("Could not import make_puzzles module - are you in the base project directory?")
 
-INPUT_FILENAME = "testing\\test_wordlist_complex.txt"
-CPROFILE_OUTPUT = "profiling\\cprofile_results.txt"
+INPUT_FILENAME = os.path.join("testing", "test_wordlist_complex.txt")
+CPROFILE_OUTPUT = os.path.join("profiling", "cprofile_results.txt")
 
 args = argparse.Namespace()
 with open(INPUT_FILENAME) as fp:
     wordlist = [w for w in fp.read().split('\n') if w]
-args.wordlist = None
+args.wordlist_file = None
 args.output_filename = None
 args.width = 24
 args.height = 24
 args.DEBUG = False
 args.LOGGING = False
-args.TIMING = False
+args.TIMED = False
 args.create_all = False
 args.placeholder = "*"
 args.puzzle_count = 100
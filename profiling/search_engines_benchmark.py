@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+from time import perf_counter
+
+cwd = os.getcwd()
+if "profiling" in cwd:
+    raise RuntimeError("ERROR: This should be executed from the base project directory as 'python profiling/search_engines_benchmark.py'")
+sys.path.append(os.path.join(os.getcwd(), "src"))
+
+try:
+    import make_puzzles
+except ImportError:
+    raise ImportError("Could not import make_puzzles module - are you in the base project directory?")
+
+INPUT_FILENAME = os.path.join("testing", "test_wordlist_complex.txt")
+REPEATS = 3
+
+with open(INPUT_FILENAME) as fp:
+    wordlist = [w for w in fp.read().split('\n') if w]
+
+args = argparse.Namespace()
+args.wordlist_file = None
+args.output_filename = None
+args.width = 24
+args.height = 24
+args.DEBUG = False
+args.LOGGING = False
+args.TIMED = False
+args.create_all = False
+args.placeholder = "*"
+args.puzzle_count = 1000
+args.incomplete = True
+args.sequential = True
+args.grid_engine = 'bytearray'
+
+print(f"\n>>> BENCHMARK -> wordlist={INPUT_FILENAME};  count={args.puzzle_count};  dimensions={args.width}x{args.height};  repeats={REPEATS}\n")
+for search_engine in make_puzzles.SEARCH_ENGINES:
+    args.search_engine = search_engine
+    timings = []
+    for _ in range(REPEATS):
+        output_puzzles = []
+        start_time = perf_counter()
+        make_puzzles.make_puzzles(args, wordlist, output_puzzles.append)
+        timings.append(perf_counter() - start_time)
+    print(f"{search_engine:>12}:  best={min(timings):.3f}s  mean={sum(timings) / len(timings):.3f}s  puzzles={len(output_puzzles)}")
@@ -1,28 +1,53 @@
+from collections import OrderedDict
 from typing import Callable
 
-from data_structures import Direction, Position
+from data_structures import Direction, GridState, Position
 
+DEFAULT_CONVERTER_CACHE_SIZE = 65536
 
-def make_word_placement_to_char_position_converter() -> Callable[[tuple[Position, Direction, str]], dict[Position, str]]:
+
+def make_word_placement_to_char_position_converter(width:int, height:int, wordlist:list[str]|None = None, cache_size:int = DEFAULT_CONVERTER_CACHE_SIZE) -> Callable[[tuple[Position, Direction, str]], dict[Position, str]]:
     """Returns a closure for converting a tuple representing word positions on grids, to
-    a tuple of x, y letter locations."""
-    func_cache = {}
+    a tuple of x, y letter locations.
+        width:              grid width
+        height:             grid height
+        wordlist:           optional list of words, to number them by. Other words are numbered as they are first seen.
+        cache_size:         maximum number of conversions to keep, the least recently used are discarded first.
+                            If 0 or less, nothing is cached.
+
+    Conversions are cached by a single integer made from the word index, grid cell index and direction index,
+    so distinct placements never share a key. The closure has a cache_info() method, which returns the cache hits,
+    misses, evictions, current size and maximum size."""
+    func_cache:OrderedDict[int, dict[Position, str]] = OrderedDict()
+    word_ndxs:dict[str, int] = {}
+    for w in wordlist or []:
+        word_ndxs.setdefault(w, len(word_ndxs))
+    direction_ndxs = {d: i for i, d in enumerate(Direction)}
+    direction_ndxs.update({d.value: i for d, i in list(direction_ndxs.items())})
+    direction_count = len(Direction)
+    cell_count = width * height
+    stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
     def func_(word_placement_data:tuple[Position, Direction, str]) -> dict[Position, str]:
         """adapter which converts between forms of data representing words on a grid.
-            func_cache:         enclosed dict containing hash keys refering to word_placement items
-                                (see below) and conversion values
+            func_cache:         enclosed OrderedDict of placement keys (see above) and conversion values,
+                                in least to most recently used order
 
             word_placement:          tuple[(int,int), Direction, str[len=1]]
-            cache:              should word_data be added to / searched for in, the cache?
 
         returns:                dict[ (int, int): str[len=1], ...]"""
-        hcode = hash(word_placement_data)
-        if hcode in func_cache:
-            return func_cache[hcode]
-        char_position_data = dict()
         position:Position = word_placement_data[0]
         direction = word_placement_data[1]
         word:str = word_placement_data[2]
+        word_ndx = word_ndxs.setdefault(word, len(word_ndxs))
+        key = ((word_ndx * cell_count + position[1] * width + position[0]) * direction_count) + direction_ndxs[direction]
+        char_position_data = func_cache.get(key)
+        if char_position_data is not None:
+            func_cache.move_to_end(key)
+            stats['hits'] += 1
+            return char_position_data
+        stats['misses'] += 1
+        char_position_data = dict()
         if isinstance(direction, Direction):
             direction_values:tuple = direction.value
         else:
@@ -30,9 +55,14 @@ def make_word_placement_to_char_position_converter() -> Callable[[tuple[Position
         for i, char in enumerate(word):
             loc = (position[0] + direction_values[0] * i, position[1] + direction_values[1] * i)
             char_position_data[loc] = char
-        if hcode not in func_cache:
-            func_cache[hcode] = char_position_data
+        if cache_size > 0:
+            func_cache[key] = char_position_data
+            if len(func_cache) > cache_size:
+                func_cache.popitem(last=False)
+                stats['evictions'] += 1
         return char_position_data
+
+    func_.cache_info = lambda: {**stats, 'size': len(func_cache), 'max_size': max(0, cache_size)}
     return func_
 
 
@@ -52,3 +82,87 @@ def char_position_to_letter_grid_converter(char_position_data:dict, width:int, h
         _array[y][x] = c
     letter_grid = tuple([tuple(row) for row in _array])
     return letter_grid
+
+
+def grid_state_to_letter_grid_converter(grid_state:GridState, placeholder:str|None = None) -> tuple:
+    """A function for converting a GridState to a filled 2D tuple of letters and placeholders.
+        grid_state:                 GridState of placed letters
+        placeholder:                symbol / object to use for empty positions
+    returns:                tuple[tuple[str[len=1], ...], ...]"""
+    cells = grid_state.cells
+    width = grid_state.width
+    letter_grid = tuple([tuple([chr(c) if c else placeholder for c in cells[y * width:(y + 1) * width]]) for y in range(grid_state.height)])
+    return letter_grid
+
+
+def char_position_to_puzzle_template(char_position_data:dict, width:int, height:int, placeholder:str) -> bytearray:
+    """A function for converting letter positions on a grid to a puzzle in text format ('row,row,...;'), as a
+    latin-1 bytearray which can be patched in place. The letter at (x, y) is at index x + y * (width + 1).
+        char_position_data:          dict[ (int, int): str[len=1], ...]
+        width:                      grid width
+        height:                     grid height
+        placeholder:                single symbol to use for empty positions
+    returns:                bytearray"""
+    template = bytearray((placeholder * width + ",") * height, 'latin-1')
+    template[-1] = ord(";")
+    row_size = width + 1
+    for (x, y), char in char_position_data.items():
+        template[x + y * row_size] = ord(char)
+    return template
+
+
+def grid_state_to_puzzle_template(grid_state:GridState, placeholder:str) -> bytearray:
+    """A function for converting a GridState to a puzzle in text format ('row,row,...;'), as a latin-1 bytearray
+    which can be patched in place. The letter at (x, y) is at index x + y * (width + 1).
+        grid_state:                 GridState of placed letters
+        placeholder:                single symbol to use for empty positions
+    returns:                bytearray"""
+    width = grid_state.width
+    cells = grid_state.cells.replace(b"\x00", placeholder.encode('latin-1'))
+    template = bytearray(b",".join([cells[y * width:(y + 1) * width] for y in range(grid_state.height)]))
+    template.append(ord(";"))
+    return template
+
+
+def get_grid_symmetries(width:int, height:int) -> tuple[tuple[int, int, int, int], ...]:
+    """Returns the symmetries of a grid, as (a, b, c, d) matrices which map a location (x, y) to (a*x + b*y, c*x + d*y),
+    moved back onto the grid. Square grids have 8 rotations and reflections, other grids 4. The identity is first."""
+    symmetries = [(1, 0, 0, 1), (-1, 0, 0, 1), (1, 0, 0, -1), (-1, 0, 0, -1)]
+    if width == height:
+        symmetries += [(0, 1, 1, 0), (0, -1, -1, 0), (0, -1, 1, 0), (0, 1, -1, 0)]
+    return tuple(symmetries)
+
+
+def transform_position(position:Position, symmetry:tuple[int, int, int, int], width:int, height:int) -> Position:
+    """Apply a grid symmetry to an (x, y) grid location."""
+    a, b, c, d = symmetry
+    x, y = position
+    return (a * x + b * y + (width - 1 if a + b < 0 else 0), c * x + d * y + (height - 1 if c + d < 0 else 0))
+
+
+def transform_direction(direction:Direction, symmetry:tuple[int, int, int, int]) -> Direction:
+    """Apply a grid symmetry to a Direction."""
+    a, b, c, d = symmetry
+    dx, dy = direction.value
+    return Direction((a * dx + b * dy, c * dx + d * dy))
+
+
+def symmetric_puzzle_variants(puzzle:str, width:int, height:int) -> list[str]:
+    """Returns the distinct rotations and reflections of a puzzle in text format ('row,row,...;'), starting with the puzzle itself."""
+    rows = puzzle.rstrip(";").split(",")
+    variants = []
+    for symmetry in get_grid_symmetries(width, height):
+        _array = [[''] * width for _ in range(height)]
+        for y, row in enumerate(rows):
+            for x, char in enumerate(row):
+                new_x, new_y = transform_position((x, y), symmetry, width, height)
+                _array[new_y][new_x] = char
+        variant = "".join([",".join(["".join(row) for row in _array]), ";"])
+        if variant not in variants:
+            variants.append(variant)
+    return variants
+
+
+def puzzle_to_letter_grid(puzzle:str) -> tuple:
+    """Convert a puzzle in text format ('row,row,...;') to a 2D tuple of letters, like char_position_to_letter_grid_converter."""
+    return tuple([tuple(row) for row in puzzle.rstrip(";").split(",")])
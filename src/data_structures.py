@@ -1,5 +1,7 @@
+from array import array
 from enum import Enum
-from typing import Any
+from itertools import compress
+from typing import Any, Callable, Generator
 
 type Position = tuple[int, int]
 
@@ -27,3 +29,207 @@ class LinkedListItemSingleLink:
 
     def __str__(self) -> str:
         return f"<LinkedListItemSingleLink:data={self.data},link={self.link}>"
+
+
+class GridState:
+    """Flat array representation of letters placed on a grid, as an alternative to {(int, int): str} dicts.
+    Each cell holds the ordinal of the letter placed there, or 0 if the cell is empty.
+    width:          width of the grid.
+    height:         height of the grid.
+    cells:          bytearray of width * height cells, in row order."""
+    __slots__ = ('width', 'height', 'cells')
+    def __init__(self, width:int, height:int) -> None:
+        self.width:int = width
+        self.height:int = height
+        self.cells:bytearray = bytearray(width * height)
+
+    def update(self, char_position_data:dict[Position, str]) -> None:
+        """Place letters on the grid, given letter locations in {(int, int): str} format.
+        Letters must have ordinals in the range 1 - 255."""
+        cells = self.cells
+        width = self.width
+        for (x, y), char in char_position_data.items():
+            cells[x + y * width] = ord(char)
+
+    def place(self, position:Position, direction:Direction, word:str) -> list[int]:
+        """Place the letters of a word on the grid. Returns the indexes of the cells which were empty
+        beforehand, to be passed to remove() to undo the placement."""
+        cells = self.cells
+        width = self.width
+        ndx = position[0] + position[1] * width
+        step = direction.value[0] + direction.value[1] * width
+        placed_cells = []
+        for char in word:
+            if not cells[ndx]:
+                cells[ndx] = ord(char)
+                placed_cells.append(ndx)
+            ndx += step
+        return placed_cells
+
+    def remove(self, placed_cells:list[int]) -> None:
+        """Undo a placement, by emptying the cells returned from place()."""
+        cells = self.cells
+        for ndx in placed_cells:
+            cells[ndx] = 0
+
+    def __str__(self) -> str:
+        return f"<GridState:width={self.width},height={self.height}>"
+
+
+class PlacementTable:
+    """Precomputed placements of words of a given length, on a grid of a given size.
+    word_length:    length of the words the placements are for.
+    directions:     immutable sequence of Direction, indexed by direction_ndx.
+    starts:         compact array of grid cell index (x + y * width) for the first letter of each placement.
+    direction_ndx:  compact array of direction indexes, one for each item in starts.
+    items:          the same placements grouped by grid cell, as ((x,y), (Direction, ...)) tuples in row order."""
+    __slots__ = ('word_length', 'directions', 'starts', 'direction_ndx', 'items')
+    def __init__(self, word_length:int, directions:tuple[Direction, ...], starts:array, direction_ndx:array, items:tuple) -> None:
+        self.word_length:int = word_length
+        self.directions:tuple[Direction, ...] = directions
+        self.starts:array = starts
+        self.direction_ndx:array = direction_ndx
+        self.items:tuple = items
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __str__(self) -> str:
+        return f"<PlacementTable:word_length={self.word_length},placements={len(self.starts)}>"
+
+
+class PlacementCounts:
+    """Tracks which placements of each word of a wordlist are still valid on a GridState, and how many there are.
+    Placing letters can only make placements invalid, so only the placements over newly filled cells are checked.
+    placements:     for each word, the immutable sequence of ((x,y), Direction) placements from its PlacementTable.
+    valid:          for each word, a bytearray flag per placement, 1 while the placement is valid.
+    counts:         for each word, the number of valid placements."""
+    __slots__ = ('placements', 'valid', 'counts', '_cover')
+    def __init__(self, wordlist:list[str], tables:list[PlacementTable], width:int, height:int) -> None:
+        """wordlist:       list of words.
+        tables:         PlacementTable for each word of the wordlist.
+        width:          width of the grid.
+        height:         height of the grid."""
+        self.placements:list[tuple] = []
+        self.valid:list[bytearray] = []
+        self.counts:list[int] = []
+        # for each word, the (placement index, letter) pairs over each grid cell
+        self._cover:list[list[list[tuple[int, int]]]] = []
+        for word, table in zip(wordlist, tables):
+            codes = [ord(c) for c in word]
+            placements = []
+            cover = [[] for _ in range(width * height)]
+            for p, (start, ndx) in enumerate(zip(table.starts, table.direction_ndx)):
+                direction = table.directions[ndx]
+                step = direction.value[0] + direction.value[1] * width
+                placements.append(((start % width, start // width), direction))
+                for k, code in enumerate(codes):
+                    cover[start + k * step].append((p, code))
+            self.placements.append(tuple(placements))
+            self.valid.append(bytearray(b'\x01' * len(placements)))
+            self.counts.append(len(placements))
+            self._cover.append(cover)
+
+    def place(self, grid_state:GridState, filled_cells:list[int], word_ndxs:list[int]) -> list[tuple[int, int]]:
+        """Update the valid placements of some words, after letters were placed in empty cells of a grid state.
+        Returns the (word index, placement index) of each placement made invalid, for .remove()"""
+        cells = grid_state.cells
+        invalidated = []
+        for w in word_ndxs:
+            valid = self.valid[w]
+            cover = self._cover[w]
+            invalidated_count = len(invalidated)
+            for c in filled_cells:
+                code = cells[c]
+                for p, p_code in cover[c]:
+                    if p_code != code and valid[p]:
+                        valid[p] = 0
+                        invalidated.append((w, p))
+            self.counts[w] -= len(invalidated) - invalidated_count
+        return invalidated
+
+    def remove(self, invalidated:list[tuple[int, int]]) -> None:
+        """Undo .place(), given the placements it made invalid."""
+        for w, p in invalidated:
+            self.valid[w][p] = 1
+            self.counts[w] += 1
+
+    def candidates(self, word_ndx:int) -> list[int]:
+        """Indexes of the valid placements of a word, in placement table order."""
+        return list(compress(range(len(self.valid[word_ndx])), self.valid[word_ndx]))
+
+    def __str__(self) -> str:
+        return f"<PlacementCounts:counts={self.counts}>"
+
+
+class QuotaAllocator:
+    """Splits the counting limit of a search node between its child candidates, in turn. Iterate to get each
+    (candidate, counting limit) pair, and .report() the number of items found below each candidate before the next.
+    Quota a child does not use, as its subtree held fewer items, is handed on to the next child. If quota is still
+    left after the last child, the candidates from more_candidates_func are searched in turn with the rest of it.
+    If quota is still left after those, the children which used all of the quota they were given may hold more items,
+    so they are searched again in turn with the rest of it, as a top-up. Each is given all of the quota left, so it
+    either uses it all or has no more items, and one top-up pass is enough. While topping up, the search below the
+    child must skip the items it found before.
+    found:          number of items reported found so far.
+    topping_up:     is the last candidate yielded a child being searched again, as a top-up?"""
+    __slots__ = ('_candidates', '_item_limit', '_more_candidates_func', '_available', '_last_found', 'found', 'topping_up')
+    # quotas are split as (item_limit + 0.008) / count, matching the split used before quotas were handed on
+    QUOTA_ADJUSTMENT_PER_MILLE = 8
+
+    def __init__(self, candidates:list, item_limit:int, more_candidates_func:Callable[[], list]|None = None) -> None:
+        """candidates:             child candidates, in search order.
+        item_limit:             counting limit of the node, or -1 for no limit.
+        more_candidates_func:   optional function returning the candidates not in candidates, if the node has more."""
+        self._candidates:list = candidates
+        self._item_limit:int = int(item_limit)
+        self._more_candidates_func:Callable[[], list]|None = more_candidates_func
+        self._available:int = 0
+        self._last_found:int = 0
+        self.found:int = 0
+        self.topping_up:bool = False
+
+    @staticmethod
+    def split(item_limit:int, count:int) -> list[int]:
+        """Integer split of a counting limit into count quotas, which add up to the limit. -1 is never split."""
+        if item_limit == -1:
+            return [-1] * count
+        if item_limit < count:
+            return [1] * item_limit + [0] * (count - item_limit)
+        scaled_limit = item_limit * 1000 + QuotaAllocator.QUOTA_ADJUSTMENT_PER_MILLE
+        divisor = count * 1000
+        return [(scaled_limit * (i + 1)) // divisor - (scaled_limit * i) // divisor for i in range(count)]
+
+    def __iter__(self) -> Generator[tuple[Any, int], Any, None]:
+        if self._item_limit == -1:
+            for candidate in self._candidates:
+                yield candidate, -1
+            return
+        # children which used all of the quota they were given, in search order
+        full_candidates = []
+        for candidate, quota in zip(self._candidates, self.split(self._item_limit, len(self._candidates))):
+            self._available += quota
+            limit = self._available
+            yield candidate, limit
+            if self._last_found == limit:
+                full_candidates.append(candidate)
+        if self._available > 0 and self._more_candidates_func is not None:
+            for candidate in self._more_candidates_func():
+                yield candidate, self._available
+                # a child using all of the quota given to it leaves none for the top-up
+                if self._available <= 0:
+                    break
+        self.topping_up = True
+        for candidate in full_candidates:
+            if self._available <= 0:
+                break
+            yield candidate, self._available
+
+    def report(self, found:int) -> None:
+        """Number of items found below the last candidate."""
+        self.found += found
+        self._available -= found
+        self._last_found = found
+
+    def __str__(self) -> str:
+        return f"<QuotaAllocator:item_limit={self._item_limit},found={self.found}>"
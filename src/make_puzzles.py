@@ -1,20 +1,31 @@
 """For making word search puzzles."""
 import argparse
-import sys
-from decimal import Decimal, getcontext
+import json
+import multiprocessing as mp
+from array import array
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
+from itertools import chain, islice
+from operator import itemgetter
 from os import path
-from random import choice
+from random import Random
 from string import ascii_lowercase
 from time import time
 from typing import Any, Callable, Generator
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import data_converters
-from data_structures import Direction, LinkedListItemSingleLink, Position
+import puzzle_files
+from data_structures import Direction, GridState, LinkedListItemSingleLink, PlacementCounts, PlacementTable, Position, QuotaAllocator
 from process_managers import WriterProcessManager
+from search_metrics import SearchMetrics
 
-getcontext().prec = 32
-DECIMAL_ADJUSTMENT_FACTOR = Decimal(0.008)
 
 ### TODO: find ways to speed up puzzle generation - validator, data conversion func, data format within linked list.
 
@@ -22,10 +33,21 @@ END_NODE = "END"
 LOGGING_FILE = f"word_search_generation.{time()}.log"
 DEFAULT_OUTPUT_FILE = f"puzzle_output.{time()}.txt"
 
-NODE_COUNT = 0
-LL_MEMORY_SIZE = 0
 DEBUG = False
 
+GRID_ENGINES = ('dict', 'bytearray', 'numpy')
+SEARCH_ENGINES = ('recursive', 'incremental', 'iterative', 'most_constrained')
+
+PARTITION_TASKS_PER_WORKER = 8
+VECTORIZED_CHUNK_SIZE = 256
+RANDOM_LETTERS_BATCH_SIZE = 64 * 1024
+# random bytes are mapped to letters, after dropping those above the largest multiple of 26, see make_random_letters_func
+RANDOM_LETTERS_TABLE = bytes([ord(ascii_lowercase[b % len(ascii_lowercase)]) for b in range(256)])
+RANDOM_LETTERS_REJECTED = bytes(range(256 - 256 % len(ascii_lowercase), 256))
+# maps empty cells (0) to 0xff and everything else to 0, see make_random_fill_func
+EMPTY_CELL_MASK_TABLE = bytes([0xff] + [0] * 255)
+WORKER_PLACEMENT_TABLES:dict[tuple[int, int], dict[int, PlacementTable]] = {}
+
 def get_wordlist(fname:str) -> list[str]:
     """Given a filename of a text file and assuming it contains a newline separated list of words,
     return the text contents as a list."""
@@ -49,36 +71,343 @@ def make_validator_check_overlapping_words(data_converter:Callable[[tuple[Positi
     return validator_func
 
 
-def make_candidates_generator_factory(directions:tuple[Direction, ...], width:int, height:int, is_sequential:bool):
-    def word_candidates_gen(word:str) -> Generator[list[tuple], Any, None]:
+def make_validator_check_grid_state():
+    word_codes:dict[str, bytes] = {}
+    def validator_func(candidate:tuple[Position, Direction, str], grid_state:GridState) -> bool:
+        """Validation function to compare a candidate placement against letters placed on a GridState. Returns True if
+        every grid cell under the candidate is either empty or already holds the same letter."""
+        position, direction, word = candidate
+        codes = word_codes.get(word)
+        if codes is None:
+            codes = word_codes[word] = bytes([ord(c) for c in word])
+        cells = grid_state.cells
+        width = grid_state.width
+        ndx = position[0] + position[1] * width
+        step = direction.value[0] + direction.value[1] * width
+        for code in codes:
+            existing = cells[ndx]
+            if existing and existing != code:
+                return False
+            ndx += step
+        return True
+    return validator_func
+
+
+def is_canonical_placement(position:Position, direction:Direction, symmetries:tuple, direction_ndx:dict[Direction, int], width:int, height:int) -> bool:
+    """Is a placement the first of its rotations and reflections, ordered by grid cell index then direction index?"""
+    key = (position[0] + position[1] * width, direction_ndx[direction])
+    for symmetry in symmetries:
+        x, y = data_converters.transform_position(position, symmetry, width, height)
+        d = data_converters.transform_direction(direction, symmetry)
+        if d in direction_ndx and (x + y * width, direction_ndx[d]) < key:
+            return False
+    return True
+
+
+def make_fixed_symmetries_func(width:int, height:int, symmetries:tuple) -> Callable[[dict|GridState], tuple]:
+    """Returns a function, which finds the grid symmetries that leave a grid of placed letters unchanged.
+    The grid is either a {(int, int): str} dict or a GridState."""
+    cell_maps = []
+    for symmetry in symmetries:
+        cell_map = [0] * (width * height)
+        for y in range(height):
+            for x in range(width):
+                new_x, new_y = data_converters.transform_position((x, y), symmetry, width, height)
+                cell_map[x + y * width] = new_x + new_y * width
+        cell_maps.append(cell_map)
+    cell_getters = [itemgetter(*cell_map) for cell_map in cell_maps]
+    def func_(existing_letters_data:dict|GridState) -> tuple:
+        if isinstance(existing_letters_data, GridState):
+            cells = existing_letters_data.cells
+            first_filled = len(cells) - len(cells.lstrip(b'\x00'))
+            if first_filled == len(cells):
+                return symmetries
+            # comparing one letter rejects most symmetries, before comparing the whole grid
+            return tuple([symmetry for symmetry, cell_map, cell_getter in zip(symmetries, cell_maps, cell_getters)
+                          if cells[cell_map[first_filled]] == cells[first_filled] and bytes(cell_getter(cells)) == cells])
+        if not existing_letters_data:
+            return symmetries
+        return tuple([symmetry for symmetry in symmetries
+                      if all([existing_letters_data.get(data_converters.transform_position(position, symmetry, width, height)) == char for position, char in existing_letters_data.items()])])
+    return func_
+
+
+def make_canonical_candidates_filter(directions:tuple[Direction, ...], width:int, height:int) -> Callable[[list, GridState], list]:
+    """Returns a function, which removes the candidate placements that are not canonical for the symmetries
+    leaving a GridState unchanged. See make_candidates_generator_factory."""
+    fixed_symmetries_func = make_fixed_symmetries_func(width, height, data_converters.get_grid_symmetries(width, height)[1:])
+    direction_ndx_map = {d: ndx for ndx, d in enumerate(directions)}
+    def func_(candidates:list[tuple[Position, Direction, str]], grid_state:GridState) -> list[tuple[Position, Direction, str]]:
+        fixed_symmetries = fixed_symmetries_func(grid_state)
+        if not fixed_symmetries:
+            return candidates
+        return [c for c in candidates if is_canonical_placement(c[0], c[1], fixed_symmetries, direction_ndx_map, width, height)]
+    return func_
+
+
+def make_placement_table(word_len:int, directions:tuple[Direction, ...], width:int, height:int, symmetries:tuple|None = None) -> PlacementTable:
+    """Build the table of every placement of a word of the given length, which fits inside a grid
+    of the given size. Placements are ordered by grid row, then column, then order of directions.
+    symmetries:             optional grid symmetries, from data_converters.get_grid_symmetries. If given, only
+                            placements which are the canonical (first) one of their symmetric twins are included."""
+    starts = array('H' if width * height <= 0xFFFF else 'I')
+    direction_ndx = array('B')
+    items = []
+    direction_values = [d.value for d in directions]
+    direction_ndx_map = {d: ndx for ndx, d in enumerate(directions)}
+    for y in range(height):
+        for x in range(width):
+            cell_directions = []
+            for ndx, (dx, dy) in enumerate(direction_values):
+                if 0 <= x + dx * (word_len - 1) < width and 0 <= y + dy * (word_len - 1) < height:
+                    if symmetries and not is_canonical_placement((x, y), directions[ndx], symmetries, direction_ndx_map, width, height):
+                        continue
+                    starts.append(x + y * width)
+                    direction_ndx.append(ndx)
+                    cell_directions.append(directions[ndx])
+            if cell_directions:
+                items.append(((x,y), tuple(cell_directions),))
+    return PlacementTable(word_len, directions, starts, direction_ndx, tuple(items))
+
+
+def get_placement_table(placement_tables:dict[int, PlacementTable], word_len:int, directions:tuple[Direction, ...], width:int, height:int, symmetries:tuple|None = None) -> PlacementTable:
+    """Fetch the placement table for a word length from a shared cache, building it on first use.
+    Caches should only hold tables made with the same symmetries."""
+    table = placement_tables.get(word_len)
+    if table is None:
+        table = placement_tables[word_len] = make_placement_table(word_len, directions, width, height, symmetries)
+    return table
+
+
+def iterate_shuffled(count:int, rng:Random) -> Generator[int, Any, None]:
+    """Lazy Fisher-Yates shuffle, which yields the numbers 0 to count - 1 in a random order. Only the swapped
+    positions are stored, so each number is drawn in constant time, as it is needed."""
+    swapped:dict[int, int] = {}
+    for i in range(count):
+        j = rng.randrange(i, count)
+        value = swapped.get(j, j)
+        swapped[j] = swapped.get(i, i)
+        yield value
+
+
+def make_candidates_generator_factory(directions:tuple[Direction, ...], width:int, height:int, is_sequential:bool, placement_tables:dict[int, PlacementTable]|None = None, symmetries:tuple|None = None, rng:Random|None = None):
+    """placement_tables:     optional cache of PlacementTable by word length, to share between callers. Tables
+                            only depend on word length and grid size, so they are built once and reused by every call.
+    rng:                    random number generator for the order of placements, when not sequential. Placements
+                            are drawn one at a time, with iterate_shuffled.
+    symmetries:             optional grid symmetries other than the identity. If given, each generator is passed the
+                            symmetries which leave the grid unchanged, and only yields the placements which are canonical
+                            for them. So puzzles which are rotations or reflections of each other are only found once."""
+    if placement_tables is None:
+        placement_tables = {}
+    if rng is None:
+        rng = Random()
+    canonical_tables:dict[int, PlacementTable] = {}
+    direction_ndx_map = {d: ndx for ndx, d in enumerate(directions)}
+    def word_candidates_gen(word:str, fixed_symmetries:tuple = ()) -> Generator[list[tuple], Any, None]:
         """Generator function to create valid placements and directions of a given word in a hypothetical grid.
         Returns:    list[
                             (x,y)       coordinates
                             [d, ...]    immutable sequence of directions
         ]"""
         word_len = len(word)
-        items:set|list = [((x,y), tuple([d for d in directions if 0 <= x + d.value[0] * (word_len - 1) < width and 0 <= y + d.value[1] * (word_len - 1) < height]),) for y in range(height) for x in range(width)]
+        # an empty grid is unchanged by every symmetry, so the canonical placements are cached
+        is_canonical = bool(symmetries) and len(fixed_symmetries) == len(symmetries)
+        if is_canonical:
+            table = get_placement_table(canonical_tables, word_len, directions, width, height, symmetries)
+        else:
+            table = get_placement_table(placement_tables, word_len, directions, width, height)
         if not is_sequential:
-            items = {i for i in items}
+            # single placements in a random order, rather than grouped by grid cell
+            for p in iterate_shuffled(len(table), rng):
+                start = table.starts[p]
+                position = (start % width, start // width)
+                d = table.directions[table.direction_ndx[p]]
+                if fixed_symmetries and not is_canonical and not is_canonical_placement(position, d, fixed_symmetries, direction_ndx_map, width, height):
+                    continue
+                yield position, (d,)
+            return
+        items:tuple = table.items
+        if fixed_symmetries and not is_canonical:
+            for position, item_directions in items:
+                item_directions = tuple([d for d in item_directions if is_canonical_placement(position, d, fixed_symmetries, direction_ndx_map, width, height)])
+                if item_directions:
+                    yield position, item_directions
+            return
         for i in items:
             yield i
     return word_candidates_gen
 
 
-def find_word_candidates(new_word:str, existing_letters_data:dict, validators:tuple[Callable], generator_factory:Callable[[str], Generator[list[tuple], Any, None]], limit=-1) -> list|set:
+def make_placement_cell_indexes(table:PlacementTable, width:int):
+    """Returns a 2D NumPy array of the grid cell indexes covered by each placement of a PlacementTable,
+    with one row per placement and one column per letter. Requires NumPy."""
+    steps = np.array([d.value[0] + d.value[1] * width for d in table.directions], dtype=np.intp)
+    starts = np.frombuffer(table.starts, dtype=table.starts.itemsize == 2 and np.uint16 or np.uint32).astype(np.intp)
+    direction_steps = steps[np.frombuffer(table.direction_ndx, dtype=np.uint8)]
+    return starts[:, None] + direction_steps[:, None] * np.arange(table.word_length, dtype=np.intp)
+
+
+def validate_placements_vectorized(word:str, grid_state:GridState, cell_indexes):
+    """Validate every placement of a word in one vectorized operation. Returns a NumPy boolean mask, True for each
+    placement (row of cell_indexes) where every grid cell is either empty or already holds the same letter."""
+    grid = np.frombuffer(grid_state.cells, dtype=np.uint8).reshape(grid_state.height, grid_state.width)
+    codes = np.frombuffer(word.encode('latin-1'), dtype=np.uint8)
+    placed_letters = grid.ravel()[cell_indexes]
+    return ((placed_letters == 0) | (placed_letters == codes)).all(axis=1)
+
+
+def make_vectorized_candidates_func(directions:tuple[Direction, ...], width:int, height:int, is_sequential:bool, placement_tables:dict[int, PlacementTable]|None = None, symmetries:tuple|None = None, rng:Random|None = None, metrics:SearchMetrics|None = None) -> Callable:
+    """Returns a replacement for find_word_candidates which validates every placement of a word at once with NumPy,
+    given a GridState. In sequential mode candidates are in the same order as find_word_candidates, otherwise the valid
+    candidates are shuffled. When there is a limit, placements are validated in chunks of VECTORIZED_CHUNK_SIZE,
+    drawn at random with iterate_shuffled when not sequential.
+    For symmetries and rng, see make_candidates_generator_factory. If metrics is given, the placements validated
+    are counted as the 'vectorized' validator. Requires NumPy."""
+    if placement_tables is None:
+        placement_tables = {}
+    if rng is None:
+        rng = Random()
+    canonical_tables:dict[int, PlacementTable] = {}
+    cell_indexes_cache = {}
+    positioned_placements_cache = {}
+    fixed_symmetries_func = make_fixed_symmetries_func(width, height, symmetries) if symmetries else None
+    direction_ndx_map = {d: ndx for ndx, d in enumerate(directions)}
+    def candidates_func(new_word:str, grid_state:GridState, limit=-1) -> list:
+        fixed_symmetries = fixed_symmetries_func(grid_state) if fixed_symmetries_func is not None else ()
+        # an empty grid is unchanged by every symmetry, so the canonical placements are cached
+        is_canonical = bool(symmetries) and len(fixed_symmetries) == len(symmetries)
+        if fixed_symmetries and not is_canonical:
+            # rare, so the placements are checked one at a time
+            candidates = [c for c in validated_candidates(new_word, grid_state, -1, False) if is_canonical_placement(c[0], c[1], fixed_symmetries, direction_ndx_map, width, height)]
+            return candidates if limit == -1 else candidates[:limit]
+        return validated_candidates(new_word, grid_state, limit, is_canonical)
+    def validated_candidates(new_word:str, grid_state:GridState, limit:int, is_canonical:bool) -> list:
+        word_len = len(new_word)
+        cache_key = (word_len, is_canonical)
+        if cache_key not in cell_indexes_cache:
+            if is_canonical:
+                table = get_placement_table(canonical_tables, word_len, directions, width, height, symmetries)
+            else:
+                table = get_placement_table(placement_tables, word_len, directions, width, height)
+            cell_indexes_cache[cache_key] = make_placement_cell_indexes(table, width)
+            positioned_placements_cache[cache_key] = tuple([((start % width, start // width), table.directions[ndx]) for start, ndx in zip(table.starts, table.direction_ndx)])
+        cell_indexes = cell_indexes_cache[cache_key]
+        if limit == -1:
+            mask = validate_placements_vectorized(new_word, grid_state, cell_indexes)
+            valid_ndx = np.flatnonzero(mask).tolist()
+            if metrics is not None:
+                metrics.candidates += len(mask)
+                metrics.add_checked('vectorized', len(mask), len(mask) - len(valid_ndx))
+            if not is_sequential:
+                rng.shuffle(valid_ndx)
+        else:
+            # with a limit, validate in chunks to stop early once enough candidates are found. When not sequential the
+            # placements are drawn with iterate_shuffled, so the candidates are a uniform sample in a uniform order.
+            placement_order = iter(range(len(cell_indexes))) if is_sequential else iterate_shuffled(len(cell_indexes), rng)
+            valid_ndx = []
+            while len(valid_ndx) < limit:
+                chunk_ndx = np.fromiter(islice(placement_order, VECTORIZED_CHUNK_SIZE), dtype=np.intp)
+                if not len(chunk_ndx):
+                    break
+                mask = validate_placements_vectorized(new_word, grid_state, cell_indexes[chunk_ndx])
+                chunk_valid_ndx = chunk_ndx[mask].tolist()
+                if metrics is not None:
+                    metrics.candidates += len(mask)
+                    metrics.add_checked('vectorized', len(mask), len(mask) - len(chunk_valid_ndx))
+                valid_ndx.extend(chunk_valid_ndx)
+            valid_ndx = valid_ndx[:limit]
+        positioned_placements = positioned_placements_cache[cache_key]
+        return [(*positioned_placements[p], new_word) for p in valid_ndx]
+    return candidates_func
+
+
+def make_forward_checking_candidates_func(candidates_func:Callable, wordlist:list[str], width:int, height:int, placement_tables:dict[int, PlacementTable]|None = None, metrics:SearchMetrics|None = None) -> Callable:
+    """Wraps a candidates function, to remove the candidates after which some later word of the wordlist no longer has
+    any valid placement, so the branch below them is cut before it is searched.
+    Each later word remembers the last valid placement found for it, which usually stays valid, so most checks
+    only compare a few grid cells. Only when it is no longer valid are the other placements of the word searched.
+    candidates_func:        function which finds list of candidate positions and directions of a given word.
+    wordlist:               list of word strings, in search order.
+    width:                  width of puzzle grid, in letters.
+    height:                 height of puzzle grid, in letters.
+    placement_tables:       optional cache of PlacementTable by word length, for the grid size.
+    metrics:                optional SearchMetrics, to count the candidates checked and pruned as the 'forward_check' validator."""
+    if placement_tables is None:
+        placement_tables = {}
+    directions = tuple([d for d in Direction])
+    word_ndx_map = {word: ndx for ndx, word in enumerate(wordlist)}
+    word_codes = [bytes([ord(c) for c in word]) for word in wordlist]
+    # for each word, the grid cell indexes under each of its placements
+    word_placement_cells = []
+    for word in wordlist:
+        table = get_placement_table(placement_tables, len(word), directions, width, height)
+        steps = [d.value[0] + d.value[1] * width for d in table.directions]
+        word_placement_cells.append(tuple([range(start, start + steps[ndx] * len(word), steps[ndx]) for start, ndx in zip(table.starts, table.direction_ndx)]))
+    supports = [0] * len(wordlist)
+
+    def has_valid_placement(word_ndx:int, cells:bytearray) -> bool:
+        placement_cells = word_placement_cells[word_ndx]
+        codes = word_codes[word_ndx]
+        support = supports[word_ndx]
+        for p in chain(range(support, len(placement_cells)), range(support)):
+            for i, code in zip(placement_cells[p], codes):
+                existing = cells[i]
+                if existing and existing != code:
+                    break
+            else:
+                supports[word_ndx] = p
+                return True
+        return False
+
+    def func_(new_word:str, existing_letters_data:dict|GridState, limit=-1) -> list:
+        later_word_ndxs = range(word_ndx_map[new_word] + 1, len(wordlist))
+        if not later_word_ndxs:
+            return candidates_func(new_word, existing_letters_data, limit=limit)
+        candidates = candidates_func(new_word, existing_letters_data, limit=-1)
+        if isinstance(existing_letters_data, GridState):
+            grid_state = existing_letters_data
+        else:
+            grid_state = GridState(width, height)
+            grid_state.update(existing_letters_data)
+        checked_candidates = []
+        pruned_count = 0
+        for candidate in candidates:
+            placed_cells = grid_state.place(*candidate)
+            is_valid = all([has_valid_placement(ndx, grid_state.cells) for ndx in later_word_ndxs])
+            grid_state.remove(placed_cells)
+            if not is_valid:
+                pruned_count += 1
+                continue
+            checked_candidates.append(candidate)
+            if len(checked_candidates) == limit:
+                break
+        if metrics is not None:
+            metrics.add_checked('forward_check', len(checked_candidates) + pruned_count, pruned_count)
+        return checked_candidates
+    return func_
+
+
+def find_word_candidates(new_word:str, existing_letters_data:dict, validators:tuple[Callable], generator_factory:Callable[[str], Generator[list[tuple], Any, None]], limit=-1, fixed_symmetries_func:Callable|None = None) -> list|set:
     """High level function to find correct placements of a given word in a hypothetical grid, given
     data on existing placements, and means to create candidate placements and validate said candidates.
 
     new_word:               the new word to place.
-    existing_letters:       dictionary of placement locations for the letters of placed words, in {(int, int): str} format.
+    existing_letters:       dictionary of placement locations for the letters of placed words, in {(int, int): str} format,
+                            or a GridState when using the 'bytearray' grid engine.
     valid_directions:       immutable array of all allowed Direction when finding possible placements.
     validators:             immutable array of validator functions, to check if a possible placement is allowed.
     data_converter:         helper function to convert from ((int, int), Direction, str) format to {(int, int): str}.
     placement_generator:    Function, that returns a generator object that creates the initial possible placements.
     width:                  positive integer, width of hypothetical grid.
     height:                 positive integer, height of hypothetical grid.
+    fixed_symmetries_func:  optional function finding the grid symmetries which leave the existing letters unchanged,
+                            which are passed to the generator factory. See make_fixed_symmetries_func.
     """
-    generator = generator_factory(new_word)
+    if fixed_symmetries_func is None:
+        generator = generator_factory(new_word)
+    else:
+        generator = generator_factory(new_word, fixed_symmetries_func(existing_letters_data))
     candidates = []
     count = 0
     for item in generator:
@@ -101,19 +430,51 @@ def find_word_candidates(new_word:str, existing_letters_data:dict, validators:tu
     return candidates
 
 
-def random_fill_puzzle_grid(grid:tuple, placeholder = str|None) -> tuple:
-    """Replaces empty grid places with random letters."""
-    tmp_ = [[char for char in row] for row in grid]
-    for j in range(len(tmp_)):
-        row = tmp_[j]
-        for i in range(len(row)):
-            if row[i] == placeholder:
-                row[i] = choice(ascii_lowercase)
-    grid = tuple([tuple(row) for row in tmp_])
+def make_random_letters_func(rng:Random|None = None, batch_size:int = RANDOM_LETTERS_BATCH_SIZE) -> Callable[[int], bytes]:
+    """Returns a function which returns a given number of random lower case letters, as latin-1 bytes.
+    Random bytes are drawn in batches of batch_size from rng, and mapped to letters with bytes.translate. Bytes above
+    the largest multiple of 26 are dropped, so every letter is equally likely.
+    rng:                    random number generator to draw bytes from. If None, a new unseeded one is used."""
+    randbytes = (rng if rng is not None else Random()).randbytes
+    buffer = b""
+    # letters are read from the buffer at offset, so the rest of it is not copied on every call
+    offset = 0
+    def func_(count:int) -> bytes:
+        nonlocal buffer, offset
+        if offset + count > len(buffer):
+            buffer = buffer[offset:]
+            offset = 0
+            while len(buffer) < count:
+                buffer += randbytes(max(batch_size, count)).translate(RANDOM_LETTERS_TABLE, RANDOM_LETTERS_REJECTED)
+        letters = buffer[offset:offset + count]
+        offset += count
+        return letters
+    return func_
+
+
+def make_random_fill_func(random_letters_func:Callable[[int], bytes]) -> Callable[[bytearray], str]:
+    """Returns a function which fills the empty cells of a puzzle in text format with random letters, and returns
+    the puzzle as a string. Empty cells hold 0, see render_patched_puzzle. The letters are merged in all at once,
+    by masking the puzzle and a run of random letters as two big integers."""
+    def func_(puzzle:bytearray) -> str:
+        size = len(puzzle)
+        empty_mask = int.from_bytes(puzzle.translate(EMPTY_CELL_MASK_TABLE), 'big')
+        letters = int.from_bytes(random_letters_func(size), 'big')
+        return (int.from_bytes(puzzle, 'big') | (letters & empty_mask)).to_bytes(size, 'big').decode('latin-1')
+    return func_
+
+
+def random_fill_puzzle_grid(grid:tuple, placeholder:str|None, random_letters_func:Callable[[int], bytes]|None = None) -> tuple:
+    """Replaces empty grid places with random letters.
+    random_letters_func:    function to draw the letters from, see make_random_letters_func. If None, a new one is made."""
+    if random_letters_func is None:
+        random_letters_func = make_random_letters_func()
+    letters = iter(random_letters_func(sum([row.count(placeholder) for row in grid])).decode('latin-1'))
+    grid = tuple([tuple([next(letters) if char == placeholder else char for char in row]) for row in grid])
     return grid
 
 
-def send_puzzles_to_writer(start_nodes:list[LinkedListItemSingleLink]|set[LinkedListItemSingleLink], writer_func:Callable, grid_width:int, grid_height:int, complete_grids:bool, placeholder:str) -> None:
+def send_puzzles_to_writer(start_nodes:list[LinkedListItemSingleLink]|set[LinkedListItemSingleLink], writer_func:Callable, grid_width:int, grid_height:int, complete_grids:bool, placeholder:str, as_grid:bool = False, random_letters_func:Callable[[int], bytes]|None = None) -> None:
     """Given a set of starting nodes for puzzle combinations, generate each puzzle then send it to
     a file writer callback.
     start_nodes:            collection of LinkedList nodes to start from.
@@ -122,7 +483,9 @@ def send_puzzles_to_writer(start_nodes:list[LinkedListItemSingleLink]|set[Linked
     grid_width:             width of puzzle grid, in letters.
     grid_height:            height of puzzle grid, in letters.
     complete_grids:         should unused grid locats be filled with random letters? otherwise use placeholder.
-    placeholder:            placeholder character used by incomplete grids."""
+    placeholder:            placeholder character used by incomplete grids.
+    as_grid:                send each puzzle as a 2D tuple of letters, instead of a string.
+    random_letters_func:    function to draw random letters from for complete grids, see make_random_letters_func."""
     for node in start_nodes:
         char_positions = dict(node.data)
         prev_link = node.link
@@ -131,14 +494,130 @@ def send_puzzles_to_writer(start_nodes:list[LinkedListItemSingleLink]|set[Linked
             prev_link = prev_link.link
         grid:tuple = data_converters.char_position_to_letter_grid_converter(char_positions, grid_width, grid_height, placeholder)
         if complete_grids:
-            grid = random_fill_puzzle_grid(grid)
+            grid = random_fill_puzzle_grid(grid, placeholder, random_letters_func)
+        if as_grid:
+            writer_func(grid)
+            continue
         str_rows = ["".join(row) for row in grid]
         str_output = ",".join(str_rows)
         str_output = "".join([str_output, ";"])
         writer_func(str_output)
 
 
-def recurse_update_linked_list(prev_item:LinkedListItemSingleLink, next_word_ndx:int, wordlist:list[str], candidates_func:Callable, converter_func:Callable, directions:tuple[Direction, ...], end_state_callback_func:Callable, item_limit:Decimal) -> None:
+def send_grid_state_puzzles_to_writer(grid_state:GridState, candidates:list[tuple[Position, Direction, str]], writer_func:Callable, complete_grids:bool, placeholder:str, random_letters_func:Callable[[int], bytes]|None = None) -> None:
+    """Given a grid state holding every word but the last, and the candidate placements of the last word,
+    generate each puzzle then send it to a file writer callback.
+    grid_state:             GridState holding the letters of the words placed so far.
+    candidates:             candidate placements for the last word, one per puzzle.
+    writer_func:            file writer callback function.
+    complete_grids:         should unused grid locats be filled with random letters? otherwise use placeholder.
+    placeholder:            placeholder character used by incomplete grids.
+    random_letters_func:    function to draw random letters from for complete grids, see make_random_letters_func."""
+    for candidate in candidates:
+        placed_cells = grid_state.place(*candidate)
+        grid:tuple = data_converters.grid_state_to_letter_grid_converter(grid_state, placeholder)
+        grid_state.remove(placed_cells)
+        if complete_grids:
+            grid = random_fill_puzzle_grid(grid, placeholder, random_letters_func)
+        str_rows = ["".join(row) for row in grid]
+        str_output = ",".join(str_rows)
+        str_output = "".join([str_output, ";"])
+        writer_func(str_output)
+
+
+def can_render_from_template(wordlist:list[str], placeholder:str) -> bool:
+    """Can puzzles of these words be rendered by patching a bytearray template? See render_patched_puzzle.
+    Needs a single symbol placeholder, and every letter to fit in one latin-1 byte."""
+    try:
+        "".join(wordlist).encode('latin-1')
+        return len(placeholder.encode('latin-1')) == 1
+    except UnicodeEncodeError:
+        return False
+
+
+def render_patched_puzzle(template:bytearray, patch:list[tuple[int, int]], fill_func:Callable[[bytearray], str]|None = None) -> str:
+    """Render one puzzle from the template of its parent grid, by patching in the letters of the last word.
+    The template is restored afterwards, to be patched again for the next sibling.
+    template:               parent grid in text format, from data_converters.char_position_to_puzzle_template.
+    patch:                  list of (template index, letter ordinal) for the letters of the last word.
+    fill_func:              function to fill empty cells with random letters, for complete grids. The template
+                            placeholder must then be '\\x00', see make_random_fill_func."""
+    originals = [(ndx, template[ndx]) for ndx, _ in patch]
+    for ndx, code in patch:
+        template[ndx] = code
+    puzzle = template.decode('latin-1') if fill_func is None else fill_func(template)
+    for ndx, code in originals:
+        template[ndx] = code
+    return puzzle
+
+
+def send_patched_puzzles_to_writer(start_nodes:list[LinkedListItemSingleLink]|set[LinkedListItemSingleLink], writer_func:Callable, grid_width:int, grid_height:int, placeholder:str, fill_func:Callable[[bytearray], str]|None = None) -> None:
+    """Faster alternative to send_puzzles_to_writer for puzzles in text format. Sibling nodes only differ
+    by the last word, so the grid of their parent is rendered once as a template, and each puzzle is rendered by
+    patching in the letters of its last word. See can_render_from_template.
+    start_nodes:            collection of LinkedList nodes to start from.
+    writer_func:            file writer callback function.
+    grid_width:             width of puzzle grid, in letters.
+    grid_height:            height of puzzle grid, in letters.
+    placeholder:            placeholder character used by incomplete grids, or '\\x00' for complete grids.
+    fill_func:              function to fill empty cells with random letters, for complete grids."""
+    row_size = grid_width + 1
+    parent = None
+    template = None
+    for node in start_nodes:
+        if template is None or node.link is not parent:
+            parent = node.link
+            char_positions = {}
+            prev_link = parent
+            while prev_link is not None and prev_link.data != END_NODE:
+                char_positions.update(prev_link.data)
+                prev_link = prev_link.link
+            template = data_converters.char_position_to_puzzle_template(char_positions, grid_width, grid_height, placeholder)
+        writer_func(render_patched_puzzle(template, [(x + y * row_size, ord(char)) for (x, y), char in node.data.items()], fill_func))
+
+
+def send_patched_grid_state_puzzles_to_writer(grid_state:GridState, candidates:list[tuple[Position, Direction, str]], writer_func:Callable, placeholder:str, fill_func:Callable[[bytearray], str]|None = None) -> None:
+    """Faster alternative to send_grid_state_puzzles_to_writer for puzzles in text format. The grid state
+    is rendered once as a template, and each puzzle is rendered by patching in the letters of its candidate.
+    See can_render_from_template.
+    grid_state:             GridState holding the letters of the words placed so far.
+    candidates:             candidate placements for the last word, one per puzzle.
+    writer_func:            file writer callback function.
+    placeholder:            placeholder character used by incomplete grids, or '\\x00' for complete grids.
+    fill_func:              function to fill empty cells with random letters, for complete grids."""
+    row_size = grid_state.width + 1
+    template = data_converters.grid_state_to_puzzle_template(grid_state, placeholder)
+    for (x, y), direction, word in candidates:
+        dx, dy = direction.value
+        writer_func(render_patched_puzzle(template, [(x + dx * i + (y + dy * i) * row_size, ord(char)) for i, char in enumerate(word)], fill_func))
+
+
+def make_more_candidates_func(candidates_func:Callable, word:str, existing_letters_data:dict|GridState, candidates:list, item_limit:int) -> Callable[[], list]|None:
+    """Returns a function which finds the remaining candidates of a word, that are not in candidates, for a QuotaAllocator.
+    Returns None if candidates were not cut short by the counting limit, so there are no more."""
+    if item_limit == -1 or len(candidates) < item_limit:
+        return None
+    def func_() -> list:
+        tried_candidates = set(candidates)
+        return [c for c in candidates_func(word, existing_letters_data, limit=-1) if c not in tried_candidates]
+    return func_
+
+
+def skip_found_leaves(candidates:list, path:tuple, emitted:set, item_limit:int) -> list:
+    """Candidates of the last word which make puzzles not already found, up to item_limit, for a search topping up
+    a subtree, see QuotaAllocator.
+    path:                   placements of the words before the last, in search order.
+    emitted:                set of the puzzles found, as tuples of the placements of every word, see record_found_leaves."""
+    new_candidates = [c for c in candidates if (*path, c) not in emitted]
+    return new_candidates if item_limit == -1 else new_candidates[:item_limit]
+
+
+def record_found_leaves(candidates:list, path:tuple, emitted:set) -> None:
+    """Remember the puzzles made by candidates of the last word, so a top-up of the subtree can skip them."""
+    emitted.update([(*path, c) for c in candidates])
+
+
+def recurse_update_linked_list(prev_item:LinkedListItemSingleLink, next_word_ndx:int, wordlist:list[str], candidates_func:Callable, converter_func:Callable, directions:tuple[Direction, ...], end_state_callback_func:Callable, item_limit:int, state_factory:Callable = dict, metrics:SearchMetrics|None = None, emitted:set|None = None, path:tuple = (), topping_up:bool = False) -> int:
     """Recursively build out the linked list tree for puzzle combinations. When a full combination is identified,
     pass it to a callback function for further processing.
     prev_item:              previous node to update from
@@ -147,51 +626,51 @@ def recurse_update_linked_list(prev_item:LinkedListItemSingleLink, next_word_ndx
     candidates_func:        function which finds list of candidate positions and directions of a given word
     directions:             list of all valid directions a word can have
     end_state_callback:     function to call, upon leaf nodes, when leaf nodes are identified
-    new_item_limit:         counting limit, of new nodes to create"""
+    new_item_limit:         counting limit, of new nodes to create. Quota a child subtree does not use is handed on
+                            to the next child, see QuotaAllocator.
+    state_factory:          function creating an empty grid state, which is updated with the letters of previous
+                            words and passed to candidates_func. Either dict, or a GridState factory.
+    metrics:                optional SearchMetrics, to count the nodes made at each depth and the leaves.
+    emitted:                set of the puzzles found, as tuples of the placements of every word, so a top-up can skip
+                            them. Made by the first call, if there is a counting limit.
+    path:                   placements of the words placed so far, in search order. Only kept with emitted.
+    topping_up:             is this subtree being searched again, as a top-up? Puzzles in emitted are skipped.
+    returns:                number of puzzles found."""
     if item_limit == 0:
-        return
+        return 0
+    if emitted is None and item_limit != -1:
+        emitted = set()
 
     if DEBUG:
         print(f"{'\t' * next_word_ndx}>>> recurse_update_linked_list:  {prev_item} {next_word_ndx} {wordlist[next_word_ndx]} {item_limit}")
 
     next_word = wordlist[next_word_ndx]
-    prev_words_data = {}
+    prev_words_data = state_factory()
     if prev_item.data != END_NODE:
         prev_words_data.update(prev_item.data)
     prev_link = prev_item.link
     while prev_link is not None and prev_link.data != END_NODE:
         prev_words_data.update(prev_link.data)
         prev_link = prev_link.link
-    candidates:list = candidates_func(next_word, prev_words_data, limit=int(item_limit))
+    is_last_word = next_word_ndx + 1 >= len(wordlist)
+    if topping_up and is_last_word:
+        candidates:list = skip_found_leaves(candidates_func(next_word, prev_words_data, limit=-1), path, emitted, item_limit)
+    else:
+        candidates:list = candidates_func(next_word, prev_words_data, limit=int(item_limit))
 
     # if there are no suitable candidates, abandon this combination
     if not len(candidates):
-        return
-    new_item_count = len(candidates)
+        return 0
     if DEBUG:
         print(f"\t{'\t' * next_word_ndx}>>> candidates count:  word={next_word} count={len(candidates)}")
 
-    new_items = [LinkedListItemSingleLink(converter_func(c), prev_item) for c in candidates]
-    differential = 0
-
-    if item_limit == -1:
-        differential = -1
-        next_limit = int(differential)
-    elif item_limit >= new_item_count:
-        differential = (Decimal(item_limit) + DECIMAL_ADJUSTMENT_FACTOR) / Decimal(new_item_count)
-        next_limit = int(differential)
-    else:
-        next_limit = 1
-    differential, next_limit = Decimal(differential), Decimal(next_limit)
-
-    if DEBUG:
-        global NODE_COUNT
-        global LL_MEMORY_SIZE
-        for item in new_items:
-            NODE_COUNT += 1
-            LL_MEMORY_SIZE += sys.getsizeof(item)
-
-    if next_word_ndx + 1 >= len(wordlist):
+    if is_last_word:
+        if emitted is not None:
+            record_found_leaves(candidates, path, emitted)
+        new_items = [LinkedListItemSingleLink(converter_func(c), prev_item) for c in candidates]
+        if metrics is not None:
+            metrics.add_nodes(next_word_ndx, len(new_items))
+            metrics.leaves += len(new_items)
         if DEBUG:
             print(f"\n\t\t{'\t' * next_word_ndx}----- END STATE:  write {len(new_items)} puzzles.\n")
         end_state_callback_func(new_items)
@@ -199,21 +678,250 @@ def recurse_update_linked_list(prev_item:LinkedListItemSingleLink, next_word_ndx
         for item in new_items:
             item.link = None
         prev_item.link = None
-    else:
-        new_word_ndx = next_word_ndx + 1
-        if not differential:
-            for next_item in new_items:
-                if DEBUG:
-                    print(f"\t\t{'\t' * next_word_ndx}>>> future recursion:  next_limit={next_limit}, with no diff")
-                recurse_update_linked_list(next_item, new_word_ndx, wordlist, candidates_func, converter_func, directions, end_state_callback_func, next_limit)
+        return len(new_items)
+
+    new_word_ndx = next_word_ndx + 1
+    allocator = QuotaAllocator(candidates, item_limit, make_more_candidates_func(candidates_func, next_word, prev_words_data, candidates, item_limit))
+    for candidate, next_limit in allocator:
+        next_item = LinkedListItemSingleLink(converter_func(candidate), prev_item)
+        if metrics is not None:
+            metrics.add_nodes(next_word_ndx)
+        if DEBUG:
+            print(f"\t\t{'\t' * next_word_ndx}>>> future recursion:  next_limit={next_limit}")
+        next_path = (*path, candidate) if emitted is not None else path
+        allocator.report(recurse_update_linked_list(next_item, new_word_ndx, wordlist, candidates_func, converter_func, directions, end_state_callback_func, next_limit, state_factory, metrics, emitted, next_path, topping_up or allocator.topping_up))
+    return allocator.found
+
+
+def iterate_update_linked_list(start_item:LinkedListItemSingleLink, start_word_ndx:int, wordlist:list[str], candidates_func:Callable, converter_func:Callable, end_state_callback_func:Callable, item_limit:int, state_factory:Callable = dict, metrics:SearchMetrics|None = None, emitted:set|None = None, start_path:tuple = (), topping_up:bool = False) -> Generator[int, Any, int]:
+    """Iteratively build out the linked list tree for puzzle combinations, using an explicit stack of the nodes being
+    expanded instead of recursion. Nodes are visited in the same order, and with the same counting limits, as
+    recurse_update_linked_list. The search advances one node per step and yields the word index of that node, so it
+    can be paused between steps and resumed by iterating again. The number of puzzles found is the return value.
+    start_item:             node to start from
+    start_word_ndx:         index number for the first word to use, from the wordlist
+    wordlist:               list of word strings
+    candidates_func:        function which finds list of candidate positions and directions of a given word
+    converter_func:         function to convert a candidate placement to the data held by a node
+    end_state_callback:     function to call, upon leaf nodes, when leaf nodes are identified
+    item_limit:             counting limit, of new nodes to create
+    state_factory:          function creating an empty grid state, see recurse_update_linked_list.
+    metrics:                optional SearchMetrics, see recurse_update_linked_list.
+    emitted:                set of the puzzles found, see recurse_update_linked_list.
+    start_path:             placements of the words placed above start_item, in search order. Only kept with emitted.
+    topping_up:             is this subtree being searched again, as a top-up? See recurse_update_linked_list."""
+    last_word_ndx = len(wordlist) - 1
+    if emitted is None and item_limit != -1:
+        emitted = set()
+
+    def expand_node(prev_item:LinkedListItemSingleLink, next_word_ndx:int, item_limit:int, path:tuple, topping_up:bool) -> QuotaAllocator|int:
+        """Find the candidates below a node. Returns a QuotaAllocator over the candidates, or the number of puzzles
+        found if the node is a leaf, or has no candidates."""
+        if item_limit == 0:
+            return 0
+        prev_words_data = state_factory()
+        if prev_item.data != END_NODE:
+            prev_words_data.update(prev_item.data)
+        prev_link = prev_item.link
+        while prev_link is not None and prev_link.data != END_NODE:
+            prev_words_data.update(prev_link.data)
+            prev_link = prev_link.link
+        if topping_up and next_word_ndx >= last_word_ndx:
+            candidates:list = skip_found_leaves(candidates_func(wordlist[next_word_ndx], prev_words_data, limit=-1), path, emitted, item_limit)
+        else:
+            candidates:list = candidates_func(wordlist[next_word_ndx], prev_words_data, limit=int(item_limit))
+
+        # if there are no suitable candidates, abandon this combination
+        if not len(candidates):
+            return 0
+
+        if next_word_ndx >= last_word_ndx:
+            if emitted is not None:
+                record_found_leaves(candidates, path, emitted)
+            new_items = [LinkedListItemSingleLink(converter_func(c), prev_item) for c in candidates]
+            if metrics is not None:
+                metrics.add_nodes(next_word_ndx, len(new_items))
+                metrics.leaves += len(new_items)
+            end_state_callback_func(new_items)
+            # limits memory usage
+            for item in new_items:
+                item.link = None
+            prev_item.link = None
+            return len(new_items)
+        return QuotaAllocator(candidates, item_limit, make_more_candidates_func(candidates_func, wordlist[next_word_ndx], prev_words_data, candidates, item_limit))
+
+    start_allocator = expand_node(start_item, start_word_ndx, int(item_limit), start_path, topping_up)
+    yield start_word_ndx
+    if not isinstance(start_allocator, QuotaAllocator):
+        return start_allocator
+    # each entry is a node whose children are being searched:
+    #   (node, word index, allocator, allocator iterator, placements so far, is topping up)
+    stack:list[tuple[LinkedListItemSingleLink, int, QuotaAllocator, Generator, tuple, bool]] = [(start_item, start_word_ndx, start_allocator, iter(start_allocator), start_path, topping_up)]
+    while stack:
+        prev_item, word_ndx, allocator, children, path, node_topping_up = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if stack:
+                stack[-1][2].report(allocator.found)
+            continue
+        candidate, next_limit = child
+        next_item = LinkedListItemSingleLink(converter_func(candidate), prev_item)
+        if metrics is not None:
+            metrics.add_nodes(word_ndx)
+        next_path = (*path, candidate) if emitted is not None else path
+        next_topping_up = node_topping_up or allocator.topping_up
+        child_allocator = expand_node(next_item, word_ndx + 1, next_limit, next_path, next_topping_up)
+        if isinstance(child_allocator, QuotaAllocator):
+            stack.append((next_item, word_ndx + 1, child_allocator, iter(child_allocator), next_path, next_topping_up))
         else:
-            old_c, next_c = Decimal(0), differential
-            for next_item in new_items:
-                if DEBUG:
-                        print(f"\t\t{'\t' * next_word_ndx}>>> future recursion:  next_limit={int(next_c) - int(old_c)}")
-                next_count = Decimal(int(next_c) - int(old_c))
-                recurse_update_linked_list(next_item, new_word_ndx, wordlist, candidates_func, converter_func, directions, end_state_callback_func, next_count)
-                old_c, next_c = next_c, next_c + differential
+            allocator.report(child_allocator)
+        yield word_ndx + 1
+    return start_allocator.found
+
+
+def recurse_update_grid_state(grid_state:GridState, next_word_ndx:int, wordlist:list[str], candidates_func:Callable, end_state_callback_func:Callable, item_limit:int, metrics:SearchMetrics|None = None, emitted:set|None = None, path:tuple = (), topping_up:bool = False) -> int:
+    """Depth first search for puzzle combinations, using one mutable grid state instead of a linked list tree.
+    Each candidate word placement is placed on the grid, searched from, then removed again. When a full combination
+    is identified, pass the grid state and the candidates for the last word to a callback function.
+    grid_state:             GridState holding the letters of the words placed so far.
+    next_word_ndx:          index number for next word to use, from the wordlist
+    wordlist:               list of word strings
+    candidates_func:        function which finds list of candidate positions and directions of a given word
+    end_state_callback:     function to call, upon leaf nodes, with the grid state and the leaf candidates
+    new_item_limit:         counting limit, of new nodes to create, see QuotaAllocator.
+    metrics:                optional SearchMetrics, to count the nodes made at each depth and the leaves.
+    emitted:                set of the puzzles found, see recurse_update_linked_list.
+    path:                   placements of the words placed so far, in search order. Only kept with emitted.
+    topping_up:             is this subtree being searched again, as a top-up? See recurse_update_linked_list.
+    returns:                number of puzzles found."""
+    if item_limit == 0:
+        return 0
+    if emitted is None and item_limit != -1:
+        emitted = set()
+
+    next_word = wordlist[next_word_ndx]
+    is_last_word = next_word_ndx + 1 >= len(wordlist)
+    if topping_up and is_last_word:
+        candidates:list = skip_found_leaves(candidates_func(next_word, grid_state, limit=-1), path, emitted, item_limit)
+    else:
+        candidates:list = candidates_func(next_word, grid_state, limit=int(item_limit))
+
+    # if there are no suitable candidates, abandon this combination
+    if not len(candidates):
+        return 0
+
+    if metrics is not None:
+        metrics.add_nodes(next_word_ndx, len(candidates))
+
+    if is_last_word:
+        if emitted is not None:
+            record_found_leaves(candidates, path, emitted)
+        if metrics is not None:
+            metrics.leaves += len(candidates)
+        end_state_callback_func(grid_state, candidates)
+        return len(candidates)
+
+    new_word_ndx = next_word_ndx + 1
+    allocator = QuotaAllocator(candidates, item_limit, make_more_candidates_func(candidates_func, next_word, grid_state, candidates, item_limit))
+    for candidate, next_limit in allocator:
+        placed_cells = grid_state.place(*candidate)
+        next_path = (*path, candidate) if emitted is not None else path
+        allocator.report(recurse_update_grid_state(grid_state, new_word_ndx, wordlist, candidates_func, end_state_callback_func, next_limit, metrics, emitted, next_path, topping_up or allocator.topping_up))
+        grid_state.remove(placed_cells)
+    return allocator.found
+
+
+def recurse_update_most_constrained(grid_state:GridState, placement_counts:PlacementCounts, remaining_word_ndxs:list[int], wordlist:list[str], end_state_callback_func:Callable, item_limit:int, rng:Random|None = None, candidates_filter:Callable|None = None, metrics:SearchMetrics|None = None, emitted:set|None = None, path:tuple = (), topping_up:bool = False) -> int:
+    """Depth first search for puzzle combinations like recurse_update_grid_state, but the next word is chosen at each
+    node instead of following the wordlist order: the remaining word with the fewest valid placements on the grid so far
+    is placed next. So branches where some word can not be placed are abandoned as soon as possible. Placements which
+    leave a remaining word with no valid placements are dropped before they are counted or searched, as --forward_check
+    does for the other engines.
+    grid_state:             GridState holding the letters of the words placed so far.
+    placement_counts:       PlacementCounts of the wordlist, updated for the words placed so far.
+    remaining_word_ndxs:    indexes of the words still to place, from the wordlist. Ties are broken by this order.
+    wordlist:               list of word strings
+    end_state_callback:     function to call, upon leaf nodes, with the grid state and the leaf candidates
+    item_limit:             counting limit, of new nodes to create, see QuotaAllocator.
+    rng:                    random number generator to shuffle the candidates with. If None, candidates are kept
+                            in placement table order.
+    candidates_filter:      optional function to filter the candidates of a word, given the grid state.
+    metrics:                optional SearchMetrics, to count the nodes made at each depth, the candidates drawn from
+                            placement_counts, the candidates removed by candidates_filter and by the forward check,
+                            and the leaves.
+    emitted:                set of the puzzles found, see recurse_update_linked_list.
+    path:                   placements of the words placed so far, in the order placed. Only kept with emitted.
+    topping_up:             is this subtree being searched again, as a top-up? See recurse_update_linked_list.
+    returns:                number of puzzles found."""
+    if item_limit == 0:
+        return 0
+    if emitted is None and item_limit != -1:
+        emitted = set()
+
+    # the most constrained word is placed next
+    word_ndx = min(remaining_word_ndxs, key=placement_counts.counts.__getitem__)
+    if not placement_counts.counts[word_ndx]:
+        return 0
+    word = wordlist[word_ndx]
+    placements = placement_counts.placements[word_ndx]
+    all_candidates = [(*placements[p], word) for p in placement_counts.candidates(word_ndx)]
+    if metrics is not None:
+        metrics.candidates += len(all_candidates)
+    if candidates_filter is not None:
+        filtered_count = len(all_candidates)
+        all_candidates = candidates_filter(all_candidates, grid_state)
+        if metrics is not None:
+            metrics.add_checked('candidates_filter', filtered_count, filtered_count - len(all_candidates))
+    next_word_ndxs = [w for w in remaining_word_ndxs if w != word_ndx]
+
+    def leaves_room(candidate:tuple[Position, Direction, str]) -> bool:
+        """Does placing the candidate leave every remaining word a valid placement?"""
+        placed_cells = grid_state.place(*candidate)
+        invalidated = placement_counts.place(grid_state, placed_cells, next_word_ndxs)
+        has_room = all(placement_counts.counts[w] for w in next_word_ndxs)
+        placement_counts.remove(invalidated)
+        grid_state.remove(placed_cells)
+        if metrics is not None:
+            metrics.add_checked('forward_check', 1, 0 if has_room else 1)
+        return has_room
+
+    # with a limit, only as many candidates as needed are drawn, the rest only if quota is left over
+    order = iterate_shuffled(len(all_candidates), rng) if rng is not None else iter(range(len(all_candidates)))
+    is_last_word = not next_word_ndxs
+    drawn = (all_candidates[i] for i in order)
+    if not is_last_word:
+        drawn = filter(leaves_room, drawn)
+    if topping_up and is_last_word:
+        candidates = skip_found_leaves(list(drawn), path, emitted, item_limit)
+    else:
+        candidates = list(drawn if item_limit == -1 else islice(drawn, item_limit))
+    more_candidates_func = lambda: list(drawn)
+
+    # if there are no suitable candidates, abandon this combination
+    if not len(candidates):
+        return 0
+
+    if metrics is not None:
+        metrics.add_nodes(len(wordlist) - len(remaining_word_ndxs), len(candidates))
+
+    if is_last_word:
+        if emitted is not None:
+            record_found_leaves(candidates, path, emitted)
+        if metrics is not None:
+            metrics.leaves += len(candidates)
+        end_state_callback_func(grid_state, candidates)
+        return len(candidates)
+
+    allocator = QuotaAllocator(candidates, item_limit, more_candidates_func)
+    for candidate, next_limit in allocator:
+        placed_cells = grid_state.place(*candidate)
+        invalidated = placement_counts.place(grid_state, placed_cells, next_word_ndxs)
+        next_path = (*path, candidate) if emitted is not None else path
+        allocator.report(recurse_update_most_constrained(grid_state, placement_counts, next_word_ndxs, wordlist, end_state_callback_func, next_limit, rng, candidates_filter, metrics, emitted, next_path, topping_up or allocator.topping_up))
+        placement_counts.remove(invalidated)
+        grid_state.remove(placed_cells)
+    return allocator.found
 
 
 def parse_args() -> argparse.Namespace:
@@ -227,23 +935,299 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('-c', '--create_all', action='store_true', help="create all possible puzzle combinations. Overrides -p and --puzzle_count")
     parser.add_argument('--incomplete', action='store_true', help='Save the resulting puzzles as incomplete grids, with a placeholder symbol for places not used by words.')
     parser.add_argument('--placeholder', type=str, default='*', help='Symbol to use as a placeholder when making incomplete puzzles. Ignored if --incomplete is not specified.')
-    parser.add_argument('-o', '--output_filename', type=str, default=DEFAULT_OUTPUT_FILE, help="Text File to save the resulting puzzles to. The default is 'output.txt'. If the specified (or default) file exists, a new file is created instead.")
+    parser.add_argument('-o', '--output_filename', type=str, default=DEFAULT_OUTPUT_FILE, help="Text File to save the resulting puzzles to. The default is 'output.txt'. If the specified (or default) file exists, a new file is created instead. Binary output defaults to a '.bin' file.")
     parser.add_argument('-s', '--sequential', action='store_true', help='Generate the puzzles in a predictable, repeatable order. Useful for testing and for study with new wordlists.')
-    parser.add_argument('--DEBUG', action='store_true', help="Show some simple debugging output to the screen.")
+    parser.add_argument('--seed', type=int, help="Seed for the random order of puzzles when not sequential, and the random letters of complete grids. Runs with the same seed and options make the same puzzles.")
+    parser.add_argument('--output_format', type=str, choices=('text', 'binary'), default='text', help="Format of the output file. 'binary' packs each puzzle into a fixed size record, see puzzle_files.py. Random letters and the placeholder must be lower case letters a - z, or a single symbol. Default is 'text'.")
+    parser.add_argument('--write_batch_size', type=int, default=WriterProcessManager.DEFAULT_BATCH_SIZE, help=f"Number of puzzles sent to the file writer process at a time. Default is {WriterProcessManager.DEFAULT_BATCH_SIZE}.")
+    parser.add_argument('--write_buffer_size', type=int, default=WriterProcessManager.DEFAULT_BUFFER_SIZE, help=f"Size in bytes of the output file write buffer. Default is {WriterProcessManager.DEFAULT_BUFFER_SIZE}.")
+    parser.add_argument('--grid_engine', type=str, choices=GRID_ENGINES, default='dict', help="Grid state representation used to validate word placements. 'bytearray' uses a flat array of grid cells. 'numpy' validates every placement of a word at once, and requires NumPy (otherwise 'bytearray' is used). Default is 'dict'.")
+    parser.add_argument('--search_engine', type=str, choices=SEARCH_ENGINES, default='recursive', help="How the puzzle combinations are searched. 'incremental' places and removes words on a single grid state instead of building a linked list tree, and always uses the 'bytearray' grid engine. 'iterative' builds the same linked list tree as 'recursive' using an explicit stack, so long wordlists are not limited by the recursion limit. 'most_constrained' is like 'incremental', but places the word with the fewest valid placements next, instead of following the wordlist order; with -c the same puzzles are found in a different order. Default is 'recursive'.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of processes to search for puzzles with. The search is split on the placements of the first words, see --partition_depth. Default is 1.")
+    parser.add_argument('--partition_depth', type=int, default=1, help="Number of words placed in each partition of the search, when using more than one worker. Default is 1.")
+    parser.add_argument('--count_only', '--count-only', action='store_true', help="Count all possible puzzle combinations, without creating or saving them.")
+    parser.add_argument('--memoize', action='store_true', help="With --count_only, remember the count below each identical partial grid. Uses more memory.")
+    parser.add_argument('--unique_up_to_symmetry', '--unique-up-to-symmetry', action='store_true', help="Only create one puzzle of each set of puzzles which are rotations or reflections of each other.")
+    parser.add_argument('--expand_symmetric', '--expand-symmetric', action='store_true', help="With --unique_up_to_symmetry, also save every distinct rotation and reflection of each puzzle. Puzzle counts are still of unique puzzles.")
+    parser.add_argument('--forward_check', '--forward-check', action='store_true', help="After each word placement, check every later word can still be placed, and abandon the placement if not. Prunes dead branches early on crowded grids, at the cost of a check per placement. The 'most_constrained' search engine always does this, without the option.")
+    parser.add_argument('--converter_cache_size', type=int, default=data_converters.DEFAULT_CONVERTER_CACHE_SIZE, help=f"Maximum number of word placements to remember the letter positions of, the least recently used are forgotten first. 0 disables the cache. Default is {data_converters.DEFAULT_CONVERTER_CACHE_SIZE}.")
+    parser.add_argument('--metrics_file', '--metrics-file', type=str, help="JSON file to save the search metrics to: nodes at each depth, candidates generated, candidates checked and rejected by each validator, converter cache hits, puzzles found and the time of each stage.")
+    parser.add_argument('--trace_memory', '--trace-memory', action='store_true', help="Measure the peak memory of the search with tracemalloc, for the search metrics. With --workers, the greatest peak of any one process. Makes the search considerably slower.")
+    parser.add_argument('--DEBUG', action='store_true', help="Show some simple debugging output to the screen, including the search metrics.")
     parser.add_argument('--LOGGING', action='store_true', help="Write verbose info to a logging file. The --DEBUG option must also be specified.  CAUTION -- logging file could become very big!!")
     parser.add_argument('--TIMED', action='store_true', help="Show estimated duration of run time.")
     return parser.parse_args()
 
 
-def make_puzzles(args:argparse.Namespace, wordlist:list[str], new_puzzle_callback:Callable) -> None:
-    """Main function.
+def make_candidates_func(grid_engine:str, width:int, height:int, is_sequential:bool, converter_func:Callable, placement_tables:dict[int, PlacementTable]|None = None, unique_up_to_symmetry:bool = False, rng:Random|None = None, metrics:SearchMetrics|None = None) -> tuple[Callable, Callable]:
+    """Build the function which finds the candidate placements of a word, for a grid engine.
+    If unique_up_to_symmetry, words are limited to canonical placements, see make_candidates_generator_factory.
+    If not is_sequential, candidates are in a random order from rng.
+    If metrics is given, the candidates generated and those checked and rejected by each validator are counted.
+    Returns the candidates function, and a function creating an empty grid state for it."""
+    # the identity is excluded, every placement is canonical for it
+    symmetries = data_converters.get_grid_symmetries(width, height)[1:] if unique_up_to_symmetry else None
+    if grid_engine == 'numpy' and np is None:
+        grid_engine = 'bytearray'
+    directions = tuple([d for d in Direction])
+    if grid_engine == 'numpy':
+        return make_vectorized_candidates_func(directions=directions, width=width, height=height, is_sequential=is_sequential, placement_tables=placement_tables, symmetries=symmetries, rng=rng, metrics=metrics), partial(GridState, width, height)
+    if grid_engine == 'bytearray':
+        validator_name, validator_non_overlapping = 'grid_state', make_validator_check_grid_state()
+        state_factory_ = partial(GridState, width, height)
+    else:
+        validator_name, validator_non_overlapping = 'overlapping_words', make_validator_check_overlapping_words(converter_func)
+        state_factory_ = dict
+    generator_factory_ = make_candidates_generator_factory(directions=directions, width=width, height=height, is_sequential=is_sequential, placement_tables=placement_tables, symmetries=symmetries, rng=rng)
+    if metrics is not None:
+        validator_non_overlapping = metrics.wrap_validator(validator_name, validator_non_overlapping)
+        generator_factory_ = metrics.wrap_generator_factory(generator_factory_)
+    fixed_symmetries_func_ = make_fixed_symmetries_func(width, height, symmetries) if symmetries else None
+    return partial(find_word_candidates, validators=(validator_non_overlapping,), generator_factory=generator_factory_, fixed_symmetries_func=fixed_symmetries_func_), state_factory_
+
+
+def search_puzzles(args:argparse.Namespace, wlist:list[str], width:int, height:int, new_puzzle_callback:Callable, item_limit:int, placements:tuple[tuple[Position, Direction, str], ...] = (), placement_tables:dict[int, PlacementTable]|None = None, rng:Random|None = None, metrics:SearchMetrics|None = None, emitted:set|None = None, topping_up:bool = False) -> int:
+    """Build the puzzle search pipeline from the command line arguments, and run the selected search engine.
     args:                   command line arguments object.
-    new_puzzle_callback:    callback function for when new puzzles are found."""
-    start_time = time()
-    if args.DEBUG:
-        global DEBUG
-        DEBUG = True
-    wlist = sorted(wordlist, key=lambda x: len(x), reverse=True)
+    wlist:                  list of word strings, in search order.
+    width:                  width of puzzle grid, in letters.
+    height:                 height of puzzle grid, in letters.
+    new_puzzle_callback:    callback function for when new puzzles are found.
+    item_limit:             counting limit of puzzles to create, or -1 for no limit.
+    placements:             candidate placements of the first words of wlist, to search below. Default is
+                            to search from an empty grid.
+    placement_tables:       optional cache of PlacementTable by word length, for the grid size.
+    rng:                    random number generator, for when not sequential. Default is one seeded from --seed.
+    metrics:                optional SearchMetrics, to count the search with.
+    emitted:                optional set of the puzzles found, as tuples of the placements of every word. The
+                            puzzles found are added to it, if there is a counting limit.
+    topping_up:             search again below placements, skipping the puzzles in emitted, see QuotaAllocator.
+    returns:                number of puzzles found."""
+    MAKE_COMPLETE_GRIDS = not args.incomplete
+    GRID_PLACEHOLDER = args.placeholder
+    IS_SEQUENTIAL = args.sequential
+    if rng is None:
+        rng = Random(getattr(args, 'seed', None))
+    GRID_ENGINE = getattr(args, 'grid_engine', 'dict')
+    SEARCH_ENGINE = getattr(args, 'search_engine', 'recursive')
+    if SEARCH_ENGINE == 'incremental' and GRID_ENGINE == 'dict':
+        GRID_ENGINE = 'bytearray'
+
+    converter_ = data_converters.make_word_placement_to_char_position_converter(width, height, wlist, getattr(args, 'converter_cache_size', data_converters.DEFAULT_CONVERTER_CACHE_SIZE))
+    get_word_candidates, state_factory_ = make_candidates_func(GRID_ENGINE, width, height, IS_SEQUENTIAL, converter_, placement_tables, getattr(args, 'unique_up_to_symmetry', False), rng, metrics)
+    if getattr(args, 'forward_check', False):
+        get_word_candidates = make_forward_checking_candidates_func(get_word_candidates, wlist, width, height, placement_tables, metrics)
+    # puzzles are rendered by patching the letters of the last word into a template of the parent grid,
+    # complete grids leave empty cells as 0 in the template, to be filled with random letters all at once
+    random_letters_ = make_random_letters_func(rng)
+    template_placeholder = "\x00" if MAKE_COMPLETE_GRIDS else GRID_PLACEHOLDER
+    if can_render_from_template(wlist, template_placeholder):
+        fill_func_ = make_random_fill_func(random_letters_) if MAKE_COMPLETE_GRIDS else None
+        puzzle_writer_ = partial(send_patched_puzzles_to_writer, writer_func=new_puzzle_callback, grid_width=width, grid_height=height, placeholder=template_placeholder, fill_func=fill_func_)
+        grid_state_writer_ = partial(send_patched_grid_state_puzzles_to_writer, writer_func=new_puzzle_callback, placeholder=template_placeholder, fill_func=fill_func_)
+    else:
+        puzzle_writer_ = partial(send_puzzles_to_writer, writer_func=new_puzzle_callback, grid_width=width, grid_height=height, placeholder=GRID_PLACEHOLDER, complete_grids=MAKE_COMPLETE_GRIDS, random_letters_func=random_letters_)
+        grid_state_writer_ = partial(send_grid_state_puzzles_to_writer, writer_func=new_puzzle_callback, placeholder=GRID_PLACEHOLDER, complete_grids=MAKE_COMPLETE_GRIDS, random_letters_func=random_letters_)
+    if emitted is None and item_limit != -1:
+        emitted = set()
+    recurse_create_puzzles = partial(recurse_update_linked_list, candidates_func=get_word_candidates, converter_func=converter_, directions=tuple([d for d in Direction]), end_state_callback_func=puzzle_writer_, state_factory=state_factory_, metrics=metrics, emitted=emitted, path=placements, topping_up=topping_up)
+    start_word_ndx = len(placements)
+
+    if SEARCH_ENGINE == 'most_constrained':
+        if placement_tables is None:
+            placement_tables = {}
+        directions = tuple([d for d in Direction])
+        tables = [get_placement_table(placement_tables, len(w), directions, width, height) for w in wlist]
+        placement_counts = PlacementCounts(wlist, tables, width, height)
+        grid_state = GridState(width, height)
+        for placement in placements:
+            placed_cells = grid_state.place(*placement)
+            placement_counts.place(grid_state, placed_cells, range(start_word_ndx, len(wlist)))
+        candidates_filter_ = None
+        if getattr(args, 'unique_up_to_symmetry', False):
+            candidates_filter_ = make_canonical_candidates_filter(directions, width, height)
+        found = recurse_update_most_constrained(grid_state, placement_counts, list(range(start_word_ndx, len(wlist))), wlist, grid_state_writer_, item_limit, None if IS_SEQUENTIAL else rng, candidates_filter_, metrics, emitted, placements, topping_up)
+    elif SEARCH_ENGINE == 'incremental':
+        grid_state = state_factory_()
+        for placement in placements:
+            grid_state.place(*placement)
+        found = recurse_update_grid_state(grid_state, start_word_ndx, wlist, get_word_candidates, grid_state_writer_, item_limit=item_limit, metrics=metrics, emitted=emitted, path=placements, topping_up=topping_up)
+    else:
+        start_node = LinkedListItemSingleLink(END_NODE, None)
+        for placement in placements:
+            start_node = LinkedListItemSingleLink(converter_(placement), start_node)
+        if SEARCH_ENGINE == 'iterative':
+            search = iterate_update_linked_list(start_node, start_word_ndx, wlist, get_word_candidates, converter_, puzzle_writer_, item_limit=item_limit, state_factory=state_factory_, metrics=metrics, emitted=emitted, start_path=placements, topping_up=topping_up)
+            while True:
+                try:
+                    next(search)
+                except StopIteration as search_end:
+                    found = search_end.value
+                    break
+        else:
+            found = recurse_create_puzzles(start_node, start_word_ndx, wlist, item_limit=item_limit)
+    if metrics is not None:
+        metrics.add_converter_cache(converter_.cache_info())
+    return found
+
+
+def partition_search_tree(wlist:list[str], width:int, height:int, is_sequential:bool, item_limit:int, depth:int, unique_up_to_symmetry:bool = False, forward_check:bool = False, rng:Random|None = None) -> list[tuple[tuple[tuple[Position, Direction, str], ...], int, list|None]]:
+    """Split the search tree into the subtrees below each combination of placements of the first words.
+    Subtrees are listed in search order, as (placements, item_limit, children): the placements made, the share of the
+    counting limit the search engines would give the subtree before any unused quota is handed on, and the subtrees
+    below each placement of the next word, in the same form. See search_puzzles_in_pool.
+    children is None for the partitions, which have depth placements, and for subtrees with no share, which are not
+    split any further. A subtree where the next word can not be placed has no children, it holds no puzzles.
+    wlist:                  list of word strings, in search order.
+    width:                  width of puzzle grid, in letters.
+    height:                 height of puzzle grid, in letters.
+    is_sequential:          is the search in sequential order?
+    item_limit:             counting limit of puzzles to create, or -1 for no limit.
+    depth:                  number of words placed in each partition. Must be less than the number of words.
+    unique_up_to_symmetry:  limit the first word to canonical placements.
+    forward_check:          remove the placements which leave a later word no room, as --forward_check does.
+    rng:                    random number generator, for when not sequential.
+    returns:                list[ ( (placement, ...), item_limit, [subtree, ...] | None ), ...]"""
+    get_word_candidates, state_factory_ = make_candidates_func('bytearray', width, height, is_sequential, None, unique_up_to_symmetry=unique_up_to_symmetry, rng=rng)
+    if forward_check:
+        get_word_candidates = make_forward_checking_candidates_func(get_word_candidates, wlist, width, height)
+    grid_state = state_factory_()
+    def split_subtree(next_word_ndx:int, placements:tuple, limit:int) -> list:
+        # every candidate is listed, those past the limit with no share, like the candidates a QuotaAllocator
+        # searches when quota is left over
+        candidates = get_word_candidates(wlist[next_word_ndx], grid_state, limit=-1)
+        subtrees = []
+        for candidate, next_limit in zip(candidates, QuotaAllocator.split(limit, len(candidates))):
+            next_placements = (*placements, candidate)
+            if next_word_ndx + 1 >= depth or next_limit == 0:
+                subtrees.append((next_placements, next_limit, None))
+                continue
+            placed_cells = grid_state.place(*candidate)
+            subtrees.append((next_placements, next_limit, split_subtree(next_word_ndx + 1, next_placements, next_limit)))
+            grid_state.remove(placed_cells)
+        return subtrees
+    return split_subtree(0, (), item_limit)
+
+
+def iterate_partitions(subtrees:list) -> Generator[tuple, Any, None]:
+    """Yields the partitions below a list of subtrees from partition_search_tree, in search order, except those with
+    no share of the counting limit."""
+    for subtree in subtrees:
+        _, limit, children = subtree
+        if children is None:
+            if limit != 0:
+                yield subtree
+        else:
+            yield from iterate_partitions(children)
+
+
+def search_partition(args:argparse.Namespace, wlist:list[str], width:int, height:int, placements:tuple, item_limit:int, with_metrics:bool = False, trace_memory:bool = False, excluded:set|frozenset = frozenset(), topping_up:bool = False) -> tuple[list[str], set, SearchMetrics|None]:
+    """Process pool task, which searches the subtree of one partition and returns its puzzles in search order, the
+    puzzles as placement paths, see search_puzzles, and the SearchMetrics of the search if with_metrics, otherwise None.
+    With trace_memory, the peak memory of the search in the worker process is traced for the metrics.
+    With topping_up, the subtree is searched again, skipping the placement paths in excluded.
+    Placement tables are kept between tasks, for the lifetime of the worker process. With --seed, each partition
+    has its own random number generator, seeded from the seed and its placements, so runs can be repeated."""
+    placement_tables = WORKER_PLACEMENT_TABLES.setdefault((width, height), {})
+    seed = getattr(args, 'seed', None)
+    rng = Random(f"{seed}:{placements}") if seed is not None else None
+    metrics = SearchMetrics(trace_memory) if with_metrics else None
+    puzzles = []
+    emitted = set(excluded) if item_limit != -1 else None
+    with metrics.trace_peak_memory() if metrics is not None else nullcontext():
+        search_puzzles(args, wlist, width, height, puzzles.append, item_limit, placements, placement_tables, rng, metrics, emitted, topping_up)
+    return puzzles, emitted.difference(excluded) if emitted is not None else set(), metrics
+
+
+def search_puzzles_in_pool(args:argparse.Namespace, wlist:list[str], width:int, height:int, new_puzzle_callback:Callable, item_limit:int, workers:int, depth:int, metrics:SearchMetrics|None = None) -> None:
+    """Search for puzzles on several processes. The search tree is partitioned on the placements of the first words,
+    each partition is searched by a process pool, and the puzzles are passed to the callback in search order.
+    Quota a subtree does not use is handed on to the next subtree of the same parent, and quota left over after the
+    last is used to top up the subtrees which used all of theirs, as a QuotaAllocator does, see partition_search_tree.
+    A subtree given more than its own share is searched again with it, as one pool task, as its quota would be split
+    differently between the subtrees below it, and so is a subtree being topped up. So the puzzles are those a single
+    process finds.
+    workers:                number of processes in the pool.
+    depth:                  number of words placed in each partition.
+    metrics:                optional SearchMetrics, the metrics of every partition search are added to it. The nodes
+                            of the placements made while partitioning are not counted. With trace_memory, the memory
+                            of each partition search is traced in its worker process.
+    See search_puzzles for the other arguments."""
+    with metrics.stage('partition') if metrics is not None else nullcontext():
+        subtrees = partition_search_tree(wlist, width, height, args.sequential, item_limit, depth, getattr(args, 'unique_up_to_symmetry', False), getattr(args, 'forward_check', False), Random(getattr(args, 'seed', None)))
+    with_metrics = metrics is not None
+    trace_memory = with_metrics and metrics.trace_memory
+    # partitions with no share of the limit are only searched if unused quota reaches them, one at a time
+    shared_partitions = list(iterate_partitions(subtrees))
+    if DEBUG:
+        print(f">>> searching {len(shared_partitions)} partitions with {workers} worker processes.")
+    # enough tasks in flight to keep the workers busy, while only a few finished ahead of the one waited for are held
+    window = workers * PARTITION_TASKS_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn')) as pool:
+        def iterate_task_results() -> Generator[tuple, Any, None]:
+            """Yields the results of the partition tasks in search order, submitting each window tasks ahead."""
+            in_flight = deque()
+            for placements, share, _ in shared_partitions:
+                in_flight.append(pool.submit(search_partition, args, wlist, width, height, placements, share, with_metrics, trace_memory))
+                if len(in_flight) >= window:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+        tasks = iterate_task_results()
+
+        def task_result(result:tuple) -> tuple[list[str], set]:
+            puzzles, paths, partition_metrics = result
+            if with_metrics:
+                metrics.merge(partition_metrics)
+            return puzzles, paths
+
+        def search_subtree(subtree:tuple, limit:int) -> tuple[list[str], set]:
+            """Returns the puzzles of a subtree from partition_search_tree, given its counting limit, and their placement paths."""
+            placements, share, children = subtree
+            if limit != share:
+                # the partitions below were searched with their own shares, which are no longer used, nor counted
+                for _ in iterate_partitions([subtree]):
+                    next(tasks)
+                return task_result(pool.submit(search_partition, args, wlist, width, height, placements, limit, with_metrics, trace_memory).result())
+            if children is None:
+                return task_result(next(tasks)) if limit != 0 else ([], set())
+            puzzles, paths = [], set()
+            hand_out_quota(children, limit, puzzles.append, paths)
+            return puzzles, paths
+
+        def hand_out_quota(subtrees:list, limit:int, callback:Callable, paths:set) -> None:
+            """Search subtrees in turn, with the counting limit of their parent, passing their puzzles to the callback
+            and adding their placement paths to paths. Then top up the subtrees which used all of their quota."""
+            available = 0
+            # subtrees which used all of the quota they were given, with the placement paths of their puzzles
+            full_subtrees = []
+            for subtree in subtrees:
+                if limit != -1:
+                    available += subtree[1]
+                puzzles, subtree_paths = search_subtree(subtree, available if limit != -1 else -1)
+                if limit != -1:
+                    if len(puzzles) == available:
+                        full_subtrees.append((subtree, subtree_paths))
+                    available -= len(puzzles)
+                paths.update(subtree_paths)
+                for puzzle in puzzles:
+                    callback(puzzle)
+            for subtree, subtree_paths in full_subtrees:
+                if available <= 0:
+                    break
+                puzzles, new_paths = task_result(pool.submit(search_partition, args, wlist, width, height, subtree[0], available, with_metrics, trace_memory, subtree_paths, True).result())
+                available -= len(puzzles)
+                paths.update(new_paths)
+                for puzzle in puzzles:
+                    callback(puzzle)
+
+        hand_out_quota(subtrees, item_limit, new_puzzle_callback, set())
+
+
+def get_grid_dimensions(args:argparse.Namespace, wlist:list[str]) -> tuple[int, int]:
+    """Returns the grid width and height from the command line arguments, increased to fit the longest word if needed.
+    wlist:                  list of word strings, longest first."""
     greatest_length = len(wlist[0])
 
     if args.width is None:
@@ -261,20 +1245,130 @@ def make_puzzles(args:argparse.Namespace, wordlist:list[str], new_puzzle_callbac
         WORD_SEARCH_HEIGHT = greatest_length
     else:
         WORD_SEARCH_HEIGHT = args.height
+    return WORD_SEARCH_WIDTH, WORD_SEARCH_HEIGHT
+
+
+def count_grid_state_puzzles(grid_state:GridState, next_word_ndx:int, wordlist:list[str], candidates_func:Callable, memo:dict[tuple[int, bytes], int]|None = None) -> int:
+    """Depth first count of the puzzle combinations below a grid state, without building nodes or rendering puzzles.
+    grid_state:             GridState holding the letters of the words placed so far.
+    next_word_ndx:          index number for next word to use, from the wordlist
+    wordlist:               list of word strings
+    candidates_func:        function which finds list of candidate positions and directions of a given word
+    memo:                   optional dict to remember the count below each (word index, grid cells) sub-state, so
+                            identical grids reached through different placements are only counted once."""
+    if memo is not None:
+        key = (next_word_ndx, bytes(grid_state.cells))
+        if key in memo:
+            return memo[key]
+    candidates:list = candidates_func(wordlist[next_word_ndx], grid_state, limit=-1)
+    if next_word_ndx + 1 >= len(wordlist):
+        count = len(candidates)
+    else:
+        count = 0
+        new_word_ndx = next_word_ndx + 1
+        for candidate in candidates:
+            placed_cells = grid_state.place(*candidate)
+            count += count_grid_state_puzzles(grid_state, new_word_ndx, wordlist, candidates_func, memo)
+            grid_state.remove(placed_cells)
+    if memo is not None:
+        memo[key] = count
+    return count
+
+
+def count_puzzles(args:argparse.Namespace, wordlist:list[str]) -> int:
+    """Count every possible puzzle combination, as would be made by the -c / --create_all option, without making them.
+    args:                   command line arguments object. The grid size, grid engine, symmetry, forward check and memoize options are used.
+    wordlist:               list of word strings."""
+    wlist = sorted(wordlist, key=lambda x: len(x), reverse=True)
+    width, height = get_grid_dimensions(args, wlist)
+    grid_engine = getattr(args, 'grid_engine', 'dict')
+    if grid_engine == 'dict':
+        grid_engine = 'bytearray'
+    get_word_candidates, state_factory_ = make_candidates_func(grid_engine, width, height, True, None, unique_up_to_symmetry=getattr(args, 'unique_up_to_symmetry', False))
+    if getattr(args, 'forward_check', False):
+        get_word_candidates = make_forward_checking_candidates_func(get_word_candidates, wlist, width, height)
+    memo = {} if getattr(args, 'memoize', False) else None
+    return count_grid_state_puzzles(state_factory_(), 0, wlist, get_word_candidates, memo)
+
+
+def make_puzzles_iter(args:argparse.Namespace, wordlist:list[str], as_grid:bool = False, metrics:SearchMetrics|None = None) -> Generator[str|tuple, Any, None]:
+    """Pull-style alternative to make_puzzles, as a generator which yields finished puzzles one at a time.
+    The search is suspended between puzzles, so the caller can stop early, and searched nodes are released as it goes.
+    Always uses the 'iterative' search engine, and ignores --workers. --forward_check and --expand_symmetric are
+    applied as by make_puzzles.
+    args:                   command line arguments object.
+    wordlist:               list of word strings.
+    as_grid:                yield each puzzle as a 2D tuple of letters, instead of a string.
+    metrics:                optional SearchMetrics, to count the search with. Stages are not timed, as the search is
+                            suspended while the caller has each puzzle."""
+    if args.DEBUG:
+        global DEBUG
+        DEBUG = True
+    wlist = sorted(wordlist, key=lambda x: len(x), reverse=True)
+    width, height = get_grid_dimensions(args, wlist)
+    item_limit = -1 if args.create_all else args.puzzle_count
+
+    # leaf nodes are rendered together by the end state callback, then handed out one at a time
+    finished_puzzles = deque()
+    converter_ = data_converters.make_word_placement_to_char_position_converter(width, height, wlist, getattr(args, 'converter_cache_size', data_converters.DEFAULT_CONVERTER_CACHE_SIZE))
+    rng = Random(getattr(args, 'seed', None))
+    get_word_candidates, state_factory_ = make_candidates_func(getattr(args, 'grid_engine', 'dict'), width, height, args.sequential, converter_, unique_up_to_symmetry=getattr(args, 'unique_up_to_symmetry', False), rng=rng, metrics=metrics)
+    if getattr(args, 'forward_check', False):
+        get_word_candidates = make_forward_checking_candidates_func(get_word_candidates, wlist, width, height, metrics=metrics)
+    expand_symmetric = getattr(args, 'unique_up_to_symmetry', False) and getattr(args, 'expand_symmetric', False)
+    finished_puzzle_callback = finished_puzzles.append
+    if expand_symmetric:
+        # variants are made from the text of each puzzle, then converted back to grids if needed
+        if as_grid:
+            finished_puzzle_callback = lambda puzzle: finished_puzzles.append(data_converters.puzzle_to_letter_grid(puzzle))
+        finished_puzzle_callback = make_symmetric_puzzles_callback(finished_puzzle_callback, width, height)
+    puzzle_writer_ = partial(send_puzzles_to_writer, writer_func=finished_puzzle_callback, grid_width=width, grid_height=height, placeholder=args.placeholder, complete_grids=not args.incomplete, as_grid=as_grid and not expand_symmetric, random_letters_func=make_random_letters_func(rng))
+    search = iterate_update_linked_list(LinkedListItemSingleLink(END_NODE, None), 0, wlist, get_word_candidates, converter_, puzzle_writer_, item_limit=item_limit, state_factory=state_factory_, metrics=metrics)
+    for _ in search:
+        while finished_puzzles:
+            yield finished_puzzles.popleft()
+    if metrics is not None:
+        metrics.add_converter_cache(converter_.cache_info())
+
+
+def make_symmetric_puzzles_callback(new_puzzle_callback:Callable, width:int, height:int) -> Callable:
+    """Wraps a new puzzle callback, so that every distinct rotation and reflection of each puzzle is passed on."""
+    def symmetric_puzzles_callback(puzzle:str) -> None:
+        for variant in data_converters.symmetric_puzzle_variants(puzzle, width, height):
+            new_puzzle_callback(variant)
+    return symmetric_puzzles_callback
+
+
+def make_search_metrics(args:argparse.Namespace) -> SearchMetrics|None:
+    """A new SearchMetrics if the command line arguments ask for metrics, otherwise None so nothing is counted."""
+    trace_memory = getattr(args, 'trace_memory', False)
+    if args.DEBUG or getattr(args, 'metrics_file', None) or trace_memory:
+        return SearchMetrics(trace_memory)
+    return None
+
+
+def make_puzzles(args:argparse.Namespace, wordlist:list[str], new_puzzle_callback:Callable, metrics:SearchMetrics|None = None) -> SearchMetrics|None:
+    """Main function.
+    args:                   command line arguments object.
+    new_puzzle_callback:    callback function for when new puzzles are found.
+    metrics:                optional SearchMetrics to count the search with. If not given, one is made when the
+                            arguments ask for metrics, see make_search_metrics.
+    returns:                the SearchMetrics of the search, or None."""
+    start_time = time()
+    if args.DEBUG:
+        global DEBUG
+        DEBUG = True
+    if metrics is None:
+        metrics = make_search_metrics(args)
+    wlist = sorted(wordlist, key=lambda x: len(x), reverse=True)
+    WORD_SEARCH_WIDTH, WORD_SEARCH_HEIGHT = get_grid_dimensions(args, wlist)
     NUM_PUZZLES = args.puzzle_count
     if args.create_all:
         NUM_PUZZLES = -1
-    NUM_PUZZLES = Decimal(NUM_PUZZLES)
-    MAKE_COMPLETE_GRIDS = not args.incomplete
-    GRID_PLACEHOLDER = args.placeholder
-    IS_SEQUENTIAL = args.sequential
-
-    converter_ = data_converters.make_word_placement_to_char_position_converter()
-    validator_non_overlapping = make_validator_check_overlapping_words(converter_)
-    generator_factory_ = make_candidates_generator_factory(directions=tuple([d for d in Direction]), width=WORD_SEARCH_WIDTH, height=WORD_SEARCH_HEIGHT, is_sequential=IS_SEQUENTIAL)
-    get_word_candidates = partial(find_word_candidates, validators=(validator_non_overlapping,), generator_factory=generator_factory_)
-    puzzle_writer_ = partial(send_puzzles_to_writer, writer_func=new_puzzle_callback, grid_width=WORD_SEARCH_WIDTH, grid_height=WORD_SEARCH_HEIGHT, placeholder=GRID_PLACEHOLDER, complete_grids=MAKE_COMPLETE_GRIDS)
-    recurse_create_puzzles = partial(recurse_update_linked_list, candidates_func=get_word_candidates, converter_func=converter_, directions=tuple([d for d in Direction]), end_state_callback_func=puzzle_writer_)
+    if getattr(args, 'grid_engine', 'dict') == 'numpy' and np is None:
+        print("WARNING: NumPy is not installed. Using the 'bytearray' grid engine instead of 'numpy'.")
+    WORKERS = getattr(args, 'workers', 1) or 1
+    PARTITION_DEPTH = getattr(args, 'partition_depth', 1) or 1
 
     if args.DEBUG and args.LOGGING:
         with open(LOGGING_FILE, "a") as fp:
@@ -282,26 +1376,26 @@ def make_puzzles(args:argparse.Namespace, wordlist:list[str], new_puzzle_callbac
             fp.write(str(wlist))
             fp.write("\n")
 
+    if getattr(args, 'unique_up_to_symmetry', False) and getattr(args, 'expand_symmetric', False):
+        new_puzzle_callback = make_symmetric_puzzles_callback(new_puzzle_callback, WORD_SEARCH_WIDTH, WORD_SEARCH_HEIGHT)
+
     if args.DEBUG:
         print(">>> beginning recursive puzzle generation.")
-    ending_node = LinkedListItemSingleLink(END_NODE, None)
-    start_word_ndx = 0
-    if DEBUG:
-        global NODE_COUNT
-        NODE_COUNT += 1
-        global LL_MEMORY_SIZE
-        LL_MEMORY_SIZE += sys.getsizeof(ending_node)
-
-    recurse_create_puzzles(ending_node, start_word_ndx, wlist, item_limit=NUM_PUZZLES)
+    with metrics.stage('search') if metrics is not None else nullcontext():
+        if WORKERS > 1 and PARTITION_DEPTH < len(wlist):
+            search_puzzles_in_pool(args, wlist, WORD_SEARCH_WIDTH, WORD_SEARCH_HEIGHT, new_puzzle_callback, NUM_PUZZLES, WORKERS, PARTITION_DEPTH, metrics)
+        else:
+            search_puzzles(args, wlist, WORD_SEARCH_WIDTH, WORD_SEARCH_HEIGHT, new_puzzle_callback, NUM_PUZZLES, metrics=metrics)
 
     if args.DEBUG:
         print(">>> puzzle generation complete.")
 
     if args.DEBUG:
-        print("TOTAL NODES ==", NODE_COUNT)
-        print("MAX GRAPH MEMORY SIZE  ==", LL_MEMORY_SIZE, "bytes")
+        for line in metrics.summary_lines():
+            print(line)
         total_time = int((time() - start_time) * 100) / 100
         print("TOTAL TIME (GENERATION)  ==", total_time, "seconds")
+    return metrics
 
 
 def main() -> None:
@@ -314,21 +1408,54 @@ def main() -> None:
         print(f"ERROR: the filepath '{args.wordlist}' could not be found.")
         return
     wordlist = get_wordlist(INPUT_FILENAME)
+    if getattr(args, 'count_only', False):
+        print("PUZZLE COUNT ==", count_puzzles(args, wordlist))
+        if args.DEBUG or args.TIMED:
+            print("TOTAL TIME (ESTIMATE) =", int((time() - start_total_time) * 100) / 100, "seconds")
+        return
+    IS_BINARY_OUTPUT = args.output_format == 'binary'
+    if IS_BINARY_OUTPUT:
+        # checked before any puzzles are made, as they could not be written
+        try:
+            puzzle_files.check_wordlist(wordlist, args.placeholder)
+        except ValueError as error:
+            print(f"ERROR: binary output is not possible, {error}")
+            return
     OUTPUT_FILENAME = args.output_filename
+    if IS_BINARY_OUTPUT and OUTPUT_FILENAME == DEFAULT_OUTPUT_FILE:
+        OUTPUT_FILENAME = path.splitext(OUTPUT_FILENAME)[0] + puzzle_files.FILE_EXTENSION
+    output_name, output_extension = path.splitext(OUTPUT_FILENAME)
     fname_counter = 0
     while path.exists(OUTPUT_FILENAME):
-        OUTPUT_FILENAME = OUTPUT_FILENAME.rsplit(f".{fname_counter}.txt", 1)[0]
         fname_counter += 1
-        OUTPUT_FILENAME = f"{OUTPUT_FILENAME}.{fname_counter}.txt"
-    writerProcess = WriterProcessManager(OUTPUT_FILENAME)
+        OUTPUT_FILENAME = f"{output_name}.{fname_counter}{output_extension}"
+    writerProcess = WriterProcessManager(OUTPUT_FILENAME, batch_size=args.write_batch_size, buffer_size=args.write_buffer_size, binary=IS_BINARY_OUTPUT)
+    new_puzzle_callback = writerProcess.add
+    if IS_BINARY_OUTPUT:
+        new_puzzle_callback = puzzle_files.BinaryPuzzleEncoder(writerProcess.add, wordlist, args.placeholder, writerProcess.add_header)
+    metrics = make_search_metrics(args)
     try:
-        make_puzzles(args, wordlist, writerProcess.add)
+        make_puzzles(args, wordlist, new_puzzle_callback, metrics)
     except KeyboardInterrupt:
         print("forcing program to halt...")
     if args.DEBUG:
         print(">>> Waiting for writer process to halt...")
-    writerProcess.halt()
-    if args.DEBUG:
+    with metrics.stage('write') if metrics is not None else nullcontext():
+        writer_metrics = writerProcess.halt()
+    if args.metrics_file:
+        with open(args.metrics_file, 'w') as fp:
+            json.dump({**metrics.to_dict(), 'writer': writer_metrics}, fp, indent=2)
+    if args.DEBUG or args.TIMED:
+        for name, value in writer_metrics.items():
+            if isinstance(value, float):
+                value = int(value * 100) / 100
+            print(f"WRITER {name.upper()} ==", value)
+    if args.DEBUG and IS_BINARY_OUTPUT:
+        print(">>> Writer Process Halted.")
+        with puzzle_files.BinaryPuzzleReader(OUTPUT_FILENAME) as reader:
+            print("\t\toutput puzzle count =", len(reader))
+        print("\t\toutput file size =", path.getsize(OUTPUT_FILENAME), "bytes")
+    elif args.DEBUG:
         print(">>> Writer Process Halted.")
         with open(OUTPUT_FILENAME) as fp:
             data = fp.read()
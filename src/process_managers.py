@@ -1,21 +1,42 @@
 import multiprocessing as mp
+from queue import Empty
+from time import monotonic
 
 
 class WriterProcessManager:
-    """Manages a separate process, used to write to a text file."""
-    __slots__ = ('_queue', '_fname','_fmode','_process')
+    """Manages a separate process, used to write to a text (or binary) file.
+    Queued items are sent to the process in batches, which are written to one open file."""
+    __slots__ = ('_queue', '_fname','_fmode','_process', '_batch', '_batch_size', '_batch_interval', '_batch_start_time', '_buffer_size', '_metrics_queue', '_queue_depth_high_water', '_batches_sent')
     END_MSG_WRITE = '!!EOF'
+    DEFAULT_BATCH_SIZE = 1000
+    DEFAULT_BATCH_INTERVAL = 1.0
+    DEFAULT_BUFFER_SIZE = 1024 * 1024
+    QUEUE_TIMEOUT = 1.0
 
-    def __init__(self, filename:str, mode:str='a'):
+    def __init__(self, filename:str, mode:str='a', batch_size:int=DEFAULT_BATCH_SIZE, batch_interval:float=DEFAULT_BATCH_INTERVAL, buffer_size:int=DEFAULT_BUFFER_SIZE, binary:bool=False):
         """Create new Process, with a file name to write to, and the writing mode.
         filename:       name of file to write to.
-        mode:           writing mode, either 'w' or 'a'. Default is 'a'."""
+        mode:           writing mode, either 'w' or 'a'. Default is 'a'.
+        batch_size:     number of items to collect before sending them to the process as one batch.
+        batch_interval: seconds after the first item of a batch was added, after which the batch is sent on the next add().
+        buffer_size:    size in bytes of the write buffer of the output file.
+        binary:         write bytes items to a binary file, instead of text."""
         ctx = mp.get_context('spawn')
-        self._queue:mp.Queue[str] = ctx.Queue()
+        self._queue:mp.Queue[list[str]|tuple|str] = ctx.Queue()
         self._fname = filename
         if mode != 'a':
             mode = 'w'
+        if binary:
+            mode += 'b'
         self._fmode = mode
+        self._batch:list[str] = []
+        self._batch_size = max(1, batch_size)
+        self._batch_interval = batch_interval
+        self._batch_start_time = 0.0
+        self._buffer_size = buffer_size
+        self._metrics_queue:mp.Queue[dict] = ctx.Queue()
+        self._queue_depth_high_water = 0
+        self._batches_sent = 0
         self._process = ctx.Process(target=self._process_write_to_file)
         self._process.start()
         # print("Starting Process")
@@ -24,35 +45,104 @@ class WriterProcessManager:
         """Queue something for the process to write.
         item:       Data to write to file.
 
-        Notes:      Data is always parsed as a string, but attempting to queue non-string data can
-            have unpredictable effects.
+        Notes:      Data is always parsed as a string (unless it is bytes, for binary files), but attempting to queue
+            non-string data can have unpredictable effects.
+                    Items are held in a batch until batch_size items are collected or batch_interval has passed,
+            see .flush() to send them earlier.
                     The WriterProcess will halt if <WriterProcessManager.END_MSG_WRITE> is queued or .halt() method invoked."""
-        if self._queue is not None:
-            self._queue.put(str(item))
-            # print("Queued Item:", item)
+        if self._queue is None:
+            return
+        if item == self.END_MSG_WRITE:
+            self.flush()
+            self._queue.put(self.END_MSG_WRITE)
+            return
+        if not self._batch:
+            self._batch_start_time = monotonic()
+        self._batch.append(item if isinstance(item, bytes) else str(item))
+        if len(self._batch) >= self._batch_size or monotonic() - self._batch_start_time >= self._batch_interval:
+            self.flush()
+
+    def add_header(self, item):
+        """Queue a file header for the process to write, after the items already queued.
+        item:       Data to write to file.
+
+        Notes:      The header is written like any other item, but is not counted as one in the writer metrics, see .halt()."""
+        if self._queue is None:
+            return
+        self.flush()
+        # a header is sent on its own, as a tuple, to tell it apart from a batch of items
+        self._queue.put((item,))
+
+    def flush(self):
+        """Send the current batch of items to the process."""
+        if self._queue is not None and self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+            self._batches_sent += 1
+            try:
+                self._queue_depth_high_water = max(self._queue_depth_high_water, self._queue.qsize())
+            except NotImplementedError:
+                # qsize() is not available on some platforms, such as macOS
+                pass
 
     def _process_write_to_file(self):
         """Process function for writing text to file.
 
-        Notes:      Will run as an infinite loop until otherwise halted or an Exception occurs. See the .halt() method for halting the process."""
-        while True:
-            try:
-                # print("Queue size:", self._queue.qsize())
-                if not self._queue.empty():
-                    next_item = self._queue.get()
+        Notes:      Blocks on the queue until there is something to write, so is idle while waiting. Runs until
+            otherwise halted, an Exception occurs, or the parent process is gone. See the .halt() method for halting the process.
+                    On halting, sends the writer metrics back through the metrics queue."""
+        items_written = 0
+        bytes_written = 0
+        header_bytes_written = 0
+        time_blocked = 0.0
+        parent = mp.parent_process()
+        with open(self._fname, self._fmode, buffering=self._buffer_size) as fp:
+            while True:
+                try:
+                    wait_start_time = monotonic()
+                    try:
+                        next_item = self._queue.get(timeout=self.QUEUE_TIMEOUT)
+                    except Empty:
+                        # the timeout allows the writer to stop, if the parent process was killed without halting it
+                        if parent is not None and not parent.is_alive():
+                            break
+                        continue
+                    finally:
+                        time_blocked += monotonic() - wait_start_time
 
                     if next_item == self.END_MSG_WRITE:
-                        with open(self._fname, self._fmode) as fp:
-                            fp.flush()
                         break
-                    with open(self._fname, self._fmode) as fp:
-                        fp.write(next_item)
-                        # print("Writing Item:", next_item)
-            except Exception:
-                break
+                    if isinstance(next_item, tuple):
+                        header_bytes_written += fp.write(next_item[0])
+                        continue
+                    if not isinstance(next_item, list):
+                        next_item = [next_item]
+                    for text in next_item:
+                        bytes_written += fp.write(text)
+                    items_written += len(next_item)
+                    # print("Writing Item:", next_item)
+                except Exception:
+                    break
+        self._metrics_queue.put({'items_written': items_written, 'bytes_written': bytes_written, 'header_bytes_written': header_bytes_written, 'time_blocked': time_blocked})
         # print(">>> End of Process Func")
 
-    def halt(self):
-        """Halts the Process."""
+    def halt(self) -> dict:
+        """Sends any remaining items, then halts the Process.
+        Returns a dict of writer metrics: items and bytes written (bytes as characters of text), bytes of file headers
+        written, which are not counted as items or in the item bytes, see .add_header(), seconds the writer spent blocked
+        waiting for items, batches sent and the high water mark of the queue depth, in batches."""
         self.add(self.END_MSG_WRITE)
+        # the writer may still be working through a large backlog, so wait as long as it is running
+        metrics = {}
+        while True:
+            is_alive = self._process.is_alive()
+            try:
+                metrics = self._metrics_queue.get(timeout=self.QUEUE_TIMEOUT)
+                break
+            except Empty:
+                if not is_alive:
+                    break
         self._process.join()
+        metrics['batches_sent'] = self._batches_sent
+        metrics['queue_depth_high_water'] = self._queue_depth_high_water
+        return metrics
@@ -0,0 +1,210 @@
+"""Compact binary file format for word search puzzles, with a random access reader.
+
+File layout (all integers little endian):
+    magic               4 bytes, b'WSPZ'
+    version             unsigned byte
+    width               unsigned short
+    height              unsigned short
+    placeholder         1 byte, latin-1 placeholder symbol
+    wordlist length     unsigned int, length of the encoded wordlist in bytes
+    wordlist            utf-8 text, newline separated words
+    records             one fixed size record per puzzle
+
+Each record holds the grid letters in row order, packed at 5 bits per letter. Letters a - z are stored as 0 - 25
+and the placeholder as 26. A file with no puzzles is empty."""
+import argparse
+import mmap
+import struct
+from string import ascii_lowercase
+from typing import Callable, Generator
+
+MAGIC = b'WSPZ'
+FILE_EXTENSION = '.bin'
+VERSION = 1
+HEADER_FORMAT = '<4sBHHcI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+BITS_PER_LETTER = 5
+PLACEHOLDER_CODE = len(ascii_lowercase)
+LETTER_MASK = (1 << BITS_PER_LETTER) - 1
+
+
+def get_record_size(width:int, height:int) -> int:
+    """Size in bytes of one puzzle record."""
+    return (width * height * BITS_PER_LETTER + 7) // 8
+
+
+def check_wordlist(wordlist:list[str], placeholder:str) -> None:
+    """Check the puzzles of a wordlist can be stored, before making them. Raises ValueError if a word has letters
+    other than lower case a - z, or the placeholder is not a single symbol other than them."""
+    if len(placeholder) != 1 or placeholder in ascii_lowercase:
+        raise ValueError(f"placeholder '{placeholder}' must be a single symbol, which is not a lower case letter.")
+    for word in wordlist:
+        if not set(word) <= set(ascii_lowercase):
+            raise ValueError(f"the word '{word}' can not be stored, only lower case letters a - z are supported.")
+
+
+def encode_header(width:int, height:int, wordlist:list[str], placeholder:str) -> bytes:
+    """Create the binary file header."""
+    if len(placeholder) != 1 or placeholder in ascii_lowercase:
+        raise ValueError(f"placeholder '{placeholder}' must be a single symbol, which is not a lower case letter.")
+    words = "\n".join(wordlist).encode('utf-8')
+    return struct.pack(HEADER_FORMAT, MAGIC, VERSION, width, height, placeholder.encode('latin-1'), len(words)) + words
+
+
+def decode_header(data:bytes|mmap.mmap) -> tuple[int, int, list[str], str, int]:
+    """Read the binary file header.
+    returns:                (width, height, wordlist, placeholder, offset of the first record)"""
+    magic, version, width, height, placeholder, words_size = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a binary puzzle file, or an unsupported version.")
+    words = bytes(data[HEADER_SIZE:HEADER_SIZE + words_size]).decode('utf-8')
+    wordlist = words.split("\n") if words else []
+    return width, height, wordlist, placeholder.decode('latin-1'), HEADER_SIZE + words_size
+
+
+def encode_puzzle(puzzle:str, width:int, height:int, placeholder:str) -> bytes:
+    """Pack a puzzle in text format ('row,row,...;') into a binary record."""
+    letters = puzzle.rstrip(";").replace(",", "")
+    if len(letters) != width * height:
+        raise ValueError(f"puzzle has {len(letters)} letters, expected {width * height} for a {width}x{height} grid.")
+    value = 0
+    for char in reversed(letters):
+        if char == placeholder:
+            code = PLACEHOLDER_CODE
+        else:
+            code = ord(char) - 97
+            if not 0 <= code < PLACEHOLDER_CODE:
+                raise ValueError(f"'{char}' can not be stored, only lower case letters a - z and the placeholder are supported.")
+        value = (value << BITS_PER_LETTER) | code
+    return value.to_bytes(get_record_size(width, height), 'little')
+
+
+def decode_puzzle(record:bytes, width:int, height:int, placeholder:str) -> str:
+    """Unpack a binary record into a puzzle in text format ('row,row,...;')."""
+    value = int.from_bytes(record, 'little')
+    symbols = ascii_lowercase + placeholder
+    letters = []
+    for _ in range(width * height):
+        letters.append(symbols[value & LETTER_MASK])
+        value >>= BITS_PER_LETTER
+    rows = ["".join(letters[y * width:(y + 1) * width]) for y in range(height)]
+    return "".join([",".join(rows), ";"])
+
+
+class BinaryPuzzleEncoder:
+    """Callback adapter, which converts text puzzles to binary records and passes them on to a writer callback.
+    The file header is passed on before the first record, with the grid size taken from the first puzzle."""
+    __slots__ = ('_writer_func', '_header_func', '_wordlist', '_placeholder', '_width', '_height')
+
+    def __init__(self, writer_func:Callable[[bytes], None], wordlist:list[str], placeholder:str, header_func:Callable[[bytes], None]|None = None) -> None:
+        """writer_func:    callback to pass the header and records to, in order.
+        wordlist:       list of words used by the puzzles.
+        placeholder:    placeholder symbol used by incomplete puzzles.
+        header_func:    optional callback to pass the header to instead of writer_func, so it is not mistaken for a record."""
+        self._writer_func = writer_func
+        self._header_func = header_func if header_func is not None else writer_func
+        self._wordlist = wordlist
+        self._placeholder = placeholder
+        self._width = 0
+        self._height = 0
+
+    def __call__(self, puzzle:str) -> None:
+        if not self._width:
+            rows = puzzle.rstrip(";").split(",")
+            self._width, self._height = len(rows[0]), len(rows)
+            self._header_func(encode_header(self._width, self._height, self._wordlist, self._placeholder))
+        self._writer_func(encode_puzzle(puzzle, self._width, self._height, self._placeholder))
+
+
+class BinaryPuzzleReader:
+    """Random access reader for binary puzzle files. The file is memory mapped rather than loaded, and
+    any puzzle can be read in constant time by its index, as reader[n]."""
+    __slots__ = ('_fp', '_mmap', 'width', 'height', 'wordlist', 'placeholder', '_offset', '_record_size', '_count')
+
+    def __init__(self, filename:str) -> None:
+        self._fp = open(filename, 'rb')
+        self._mmap = None
+        self.width, self.height, self.wordlist, self.placeholder = 0, 0, [], ''
+        self._offset, self._record_size, self._count = 0, 1, 0
+        try:
+            self._mmap = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can not be memory mapped, and holds no puzzles
+            return
+        self.width, self.height, self.wordlist, self.placeholder, self._offset = decode_header(self._mmap)
+        self._record_size = get_record_size(self.width, self.height)
+        self._count = (len(self._mmap) - self._offset) // self._record_size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, ndx:int) -> str:
+        """Returns puzzle number ndx, in text format ('row,row,...;')."""
+        if ndx < 0:
+            ndx += self._count
+        if not 0 <= ndx < self._count:
+            raise IndexError("puzzle index out of range")
+        start = self._offset + ndx * self._record_size
+        return decode_puzzle(self._mmap[start:start + self._record_size], self.width, self.height, self.placeholder)
+
+    def __iter__(self) -> Generator[str, None, None]:
+        for ndx in range(self._count):
+            yield self[ndx]
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        self._fp.close()
+
+    def __enter__(self) -> 'BinaryPuzzleReader':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def text_to_binary(text_filename:str, binary_filename:str, wordlist:list[str], placeholder:str = '*') -> int:
+    """Convert a text puzzle file to the binary format. Returns the number of puzzles converted."""
+    count = 0
+    with open(text_filename) as text_fp, open(binary_filename, 'wb') as binary_fp:
+        encoder = BinaryPuzzleEncoder(binary_fp.write, wordlist, placeholder)
+        for puzzle in text_fp.read().split(";"):
+            puzzle = puzzle.strip()
+            if puzzle:
+                encoder(puzzle)
+                count += 1
+    return count
+
+
+def binary_to_text(binary_filename:str, text_filename:str) -> int:
+    """Convert a binary puzzle file to the text format. Returns the number of puzzles converted."""
+    with BinaryPuzzleReader(binary_filename) as reader, open(text_filename, 'w') as text_fp:
+        for puzzle in reader:
+            text_fp.write(puzzle)
+        return len(reader)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert puzzle files between the text and binary formats.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    to_binary = subparsers.add_parser('to_binary', help="Convert a text puzzle file to a binary puzzle file.")
+    to_binary.add_argument('text_file')
+    to_binary.add_argument('binary_file')
+    to_binary.add_argument('--wordlist_file', help="Text file of the words used by the puzzles, stored in the file header.")
+    to_binary.add_argument('--placeholder', type=str, default='*', help="Placeholder symbol used by incomplete puzzles. Default is '*'.")
+    to_text = subparsers.add_parser('to_text', help="Convert a binary puzzle file to a text puzzle file.")
+    to_text.add_argument('binary_file')
+    to_text.add_argument('text_file')
+    args = parser.parse_args()
+    if args.command == 'to_binary':
+        wordlist = []
+        if args.wordlist_file:
+            with open(args.wordlist_file) as fp:
+                wordlist = [w.strip() for w in fp.readlines() if w.strip()]
+        print("converted", text_to_binary(args.text_file, args.binary_file, wordlist, args.placeholder), "puzzles.")
+    else:
+        print("converted", binary_to_text(args.binary_file, args.text_file), "puzzles.")
+
+
+if __name__ == "__main__":
+    main()
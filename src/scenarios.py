@@ -0,0 +1,144 @@
+"""Seeded synthetic wordlists and grid sizes, for scale testing and benchmarking the puzzle search.
+
+A scenario is a wordlist with a grid size to fit it. Wordlists are controlled by the number of words, the
+distribution of word lengths, the alphabet, and how much the words share letters with each other. The same
+seed and settings always make the same scenario."""
+import argparse
+from math import ceil, sqrt
+from random import Random
+from string import ascii_lowercase
+
+DEFAULT_SEED = 1234
+DEFAULT_DENSITY = 0.35
+MAX_WORD_ATTEMPTS = 100
+
+# settings of make_scenario, for typical and pathological inputs
+PRESETS = {
+    'tiny': {'count': 4, 'min_length': 3, 'max_length': 5, 'density': 0.5},
+    'classroom': {'count': 12, 'min_length': 4, 'max_length': 8},
+    'product': {'count': 40, 'min_length': 4, 'max_length': 9, 'width': 30, 'height': 30},
+    'long_words': {'count': 10, 'min_length': 10, 'max_length': 14},
+    'crowded': {'count': 16, 'min_length': 4, 'max_length': 7, 'density': 0.8},
+    'high_overlap': {'count': 20, 'min_length': 4, 'max_length': 8, 'overlap': 0.9},
+    # many words sharing few letters, so most placements cross other words and many crossings match
+    'few_letters': {'count': 20, 'min_length': 3, 'max_length': 6, 'alphabet': 'abc', 'density': 0.5},
+}
+
+
+class Scenario:
+    """A synthetic wordlist, with a grid size to fit it.
+    name:           name of the scenario, such as a preset name.
+    wordlist:       list of word strings.
+    width:          width of puzzle grid, in letters.
+    height:         height of puzzle grid, in letters.
+    seed:           seed the wordlist was made from."""
+    __slots__ = ('name', 'wordlist', 'width', 'height', 'seed')
+    def __init__(self, name:str, wordlist:list[str], width:int, height:int, seed:int|str|None) -> None:
+        self.name:str = name
+        self.wordlist:list[str] = wordlist
+        self.width:int = width
+        self.height:int = height
+        self.seed:int|str|None = seed
+
+    def __str__(self) -> str:
+        return f"<Scenario:name={self.name},words={len(self.wordlist)},grid={self.width}x{self.height},seed={self.seed}>"
+
+
+def make_wordlist(count:int, min_length:int = 3, max_length:int = 8, alphabet:str = ascii_lowercase, overlap:float = 0.0, length_weights:dict[int, float]|None = None, rng:Random|None = None) -> list[str]:
+    """Make a list of distinct random words.
+    count:          number of words.
+    min_length:     shortest word length.
+    max_length:     longest word length.
+    alphabet:       letters to make words from, lower case a - z.
+    overlap:        from 0 to 1, the chance of each letter being copied from the words made so far instead of drawn from
+                    the alphabet. Higher overlap makes words share more letters, so more crossings can match.
+    length_weights: optional relative weights of word lengths, such as {4: 1, 5: 2, 6: 1}. Default is every length
+                    from min_length to max_length equally likely.
+    rng:            random number generator. Default is an unseeded one."""
+    if not alphabet or not set(alphabet) <= set(ascii_lowercase):
+        raise ValueError(f"alphabet '{alphabet}' must be lower case letters a - z.")
+    if not 1 <= min_length <= max_length:
+        raise ValueError(f"word lengths must be from 1 up, and min_length {min_length} must not be more than max_length {max_length}.")
+    if not 0 <= overlap <= 1:
+        raise ValueError(f"overlap {overlap} must be from 0 to 1.")
+    if rng is None:
+        rng = Random()
+    if length_weights is None:
+        length_weights = {length: 1 for length in range(min_length, max_length + 1)}
+    lengths = list(length_weights.keys())
+    weights = list(length_weights.values())
+    alphabet = "".join(sorted(set(alphabet)))
+    words:list[str] = []
+    seen:set[str] = set()
+    used_letters:list[str] = []
+    attempts = 0
+    while len(words) < count:
+        attempts += 1
+        if attempts > count * MAX_WORD_ATTEMPTS:
+            raise ValueError(f"could not make {count} distinct words from the alphabet '{alphabet}' with lengths {lengths}.")
+        length = rng.choices(lengths, weights)[0]
+        word = "".join([rng.choice(used_letters) if used_letters and rng.random() < overlap else rng.choice(alphabet) for _ in range(length)])
+        if word in seen:
+            continue
+        seen.add(word)
+        words.append(word)
+        used_letters.extend(word)
+    return words
+
+
+def fit_grid_size(wordlist:list[str], density:float = DEFAULT_DENSITY) -> tuple[int, int]:
+    """Size of the square grid for a wordlist, where the letters of the words fill about density of the grid cells.
+    The grid is never narrower than the longest word."""
+    if not 0 < density <= 1:
+        raise ValueError(f"density {density} must be more than 0, and at most 1.")
+    side = max(max([len(w) for w in wordlist]), ceil(sqrt(sum([len(w) for w in wordlist]) / density)))
+    return side, side
+
+
+def make_scenario(name:str = 'custom', count:int = 12, min_length:int = 3, max_length:int = 8, alphabet:str = ascii_lowercase, overlap:float = 0.0, length_weights:dict[int, float]|None = None, density:float = DEFAULT_DENSITY, width:int|None = None, height:int|None = None, seed:int|str|None = DEFAULT_SEED) -> Scenario:
+    """Make a seeded wordlist, see make_wordlist, with a grid size to fit it.
+    density:        fraction of grid cells for the letters of the words to fill, see fit_grid_size.
+    width:          grid width, instead of fitting it to the wordlist. Never narrower than the longest word.
+    height:         grid height, instead of fitting it to the wordlist. Never shorter than the longest word.
+    seed:           seed for the random number generator. None makes a different wordlist each time."""
+    wordlist = make_wordlist(count, min_length, max_length, alphabet, overlap, length_weights, Random(seed))
+    fitted_width, fitted_height = fit_grid_size(wordlist, density)
+    longest = max([len(w) for w in wordlist])
+    return Scenario(name, wordlist, max(longest, width or fitted_width), max(longest, height or fitted_height), seed)
+
+
+def make_preset_scenario(name:str, seed:int|str|None = DEFAULT_SEED, **settings) -> Scenario:
+    """Make the scenario of a preset, see PRESETS. Keyword arguments replace settings of the preset."""
+    if name not in PRESETS:
+        raise ValueError(f"unknown scenario '{name}', choose from: {', '.join(PRESETS)}.")
+    return make_scenario(name, **{**PRESETS[name], **settings}, seed=seed)
+
+
+def make_scaling_scenarios(name:str, setting:str, values:list, seed:int|str|None = DEFAULT_SEED) -> list[Scenario]:
+    """Scenarios of a preset with one setting changed to each of values, such as the word count, to measure how the
+    search scales with it. Every scenario has the same seed, and is named after the preset and the setting value."""
+    scenarios = []
+    for value in values:
+        scenario = make_preset_scenario(name, seed, **{setting: value})
+        scenario.name = f"{name}_{setting}_{value}"
+        scenarios.append(scenario)
+    return scenarios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write the wordlist of a synthetic scenario to a file, and show the grid size to use with it.")
+    parser.add_argument('scenario', choices=PRESETS.keys(), help="Preset scenario to make.")
+    parser.add_argument('-o', '--output_filename', type=str, help="Text file to write the wordlist to, one word per line. Default is '<scenario>.txt'.")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f"Seed for the wordlist. Default is {DEFAULT_SEED}.")
+    parser.add_argument('--count', type=int, help="Number of words, instead of the preset's.")
+    args = parser.parse_args()
+    settings = {} if args.count is None else {'count': args.count}
+    scenario = make_preset_scenario(args.scenario, args.seed, **settings)
+    output_filename = args.output_filename or f"{scenario.name}.txt"
+    with open(output_filename, 'w') as fp:
+        fp.write("\n".join(scenario.wordlist))
+    print(f"wrote {len(scenario.wordlist)} words to {output_filename}, use with:  -w {scenario.width} -l {scenario.height}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import json
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Callable, Generator
+
+
+class SearchMetrics:
+    """Counters of a puzzle search, passed through the search engines. Engines only count when they are given a
+    SearchMetrics, and validators are only wrapped for counting then, so a search without one is not slowed down.
+    nodes:              number of search nodes made at each depth, depth 0 being the first word placed.
+    candidates:         number of candidate placements generated, before validation.
+    checked:            number of candidates checked by each validator, by validator name.
+    rejected:           number of candidates rejected by each validator, by validator name.
+    leaves:             number of puzzles found.
+    converter_cache:    hits, misses and evictions of the word placement converter caches.
+    stage_times:        seconds spent in each stage, by stage name.
+    trace_memory:       measure the peak memory of stages with tracemalloc. Slows the stages down considerably.
+    peak_memory:        peak memory in bytes traced during any stage, if trace_memory. Merged metrics keep the greatest
+                        peak, so with a process pool it is the peak of the one process which used the most."""
+    __slots__ = ('nodes', 'candidates', 'checked', 'rejected', 'leaves', 'converter_cache', 'stage_times', 'trace_memory', 'peak_memory')
+    CONVERTER_CACHE_KEYS = ('hits', 'misses', 'evictions')
+
+    def __init__(self, trace_memory:bool = False) -> None:
+        self.nodes:list[int] = []
+        self.candidates:int = 0
+        self.checked:dict[str, int] = {}
+        self.rejected:dict[str, int] = {}
+        self.leaves:int = 0
+        self.converter_cache:dict[str, int] = dict.fromkeys(self.CONVERTER_CACHE_KEYS, 0)
+        self.stage_times:dict[str, float] = {}
+        self.trace_memory:bool = trace_memory
+        self.peak_memory:int = 0
+
+    @property
+    def total_nodes(self) -> int:
+        return sum(self.nodes)
+
+    def add_nodes(self, depth:int, count:int = 1) -> None:
+        nodes = self.nodes
+        if depth >= len(nodes):
+            nodes.extend([0] * (depth + 1 - len(nodes)))
+        nodes[depth] += count
+
+    def add_checked(self, name:str, checked:int, rejected:int) -> None:
+        """Count candidates checked and rejected by a validator, for validators which check many at once."""
+        self.checked[name] = self.checked.get(name, 0) + checked
+        self.rejected[name] = self.rejected.get(name, 0) + rejected
+
+    def add_converter_cache(self, cache_info:dict[str, int]) -> None:
+        """Add the counts of a converter cache, see data_converters.make_word_placement_to_char_position_converter."""
+        for key in self.CONVERTER_CACHE_KEYS:
+            self.converter_cache[key] += cache_info[key]
+
+    def wrap_validator(self, name:str, validator:Callable[[tuple, Any], bool]) -> Callable[[tuple, Any], bool]:
+        """Returns the validator, wrapped to count the candidates it checks and rejects under name."""
+        checked = self.checked
+        rejected = self.rejected
+        checked.setdefault(name, 0)
+        rejected.setdefault(name, 0)
+        def validator_func(candidate:tuple, existing_letters_data:Any) -> bool:
+            checked[name] += 1
+            if validator(candidate, existing_letters_data):
+                return True
+            rejected[name] += 1
+            return False
+        return validator_func
+
+    def wrap_generator_factory(self, generator_factory:Callable[..., Generator[tuple, Any, None]]) -> Callable[..., Generator[tuple, Any, None]]:
+        """Returns the candidates generator factory, wrapped to count the candidates generated. The generators yield
+        a position with a sequence of directions, each direction is one candidate."""
+        def generator_factory_(*args) -> Generator[tuple, Any, None]:
+            for item in generator_factory(*args):
+                self.candidates += len(item[1])
+                yield item
+        return generator_factory_
+
+    @contextmanager
+    def stage(self, name:str) -> Generator[None, Any, None]:
+        """Context manager adding the time spent inside it to a stage. With trace_memory, memory is traced during the
+        stage, see trace_peak_memory."""
+        with self.trace_peak_memory():
+            start_time = perf_counter()
+            try:
+                yield
+            finally:
+                self.stage_times[name] = self.stage_times.get(name, 0.0) + perf_counter() - start_time
+
+    @contextmanager
+    def trace_peak_memory(self) -> Generator[None, Any, None]:
+        """Context manager which, with trace_memory, traces memory with tracemalloc inside it and keeps the peak,
+        unless it is already being traced by an outer stage or the caller. Does nothing otherwise."""
+        start_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if self.trace_memory and tracemalloc.is_tracing():
+                self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            if start_tracing:
+                tracemalloc.stop()
+
+    def merge(self, other:"SearchMetrics") -> None:
+        """Add the counts of another search, such as one of the partitions searched by a process pool."""
+        for depth, count in enumerate(other.nodes):
+            self.add_nodes(depth, count)
+        self.candidates += other.candidates
+        for name in other.checked:
+            self.add_checked(name, other.checked[name], other.rejected.get(name, 0))
+        self.leaves += other.leaves
+        self.add_converter_cache(other.converter_cache)
+        for name, seconds in other.stage_times.items():
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + seconds
+        self.peak_memory = max(self.peak_memory, other.peak_memory)
+
+    def to_dict(self) -> dict:
+        return {'nodes': {'total': self.total_nodes, 'by_depth': list(self.nodes)}, 'candidates': self.candidates,
+                'validators': {name: {'checked': self.checked[name], 'rejected': self.rejected.get(name, 0)} for name in self.checked},
+                'leaves': self.leaves, 'converter_cache': dict(self.converter_cache),
+                'stage_times': dict(self.stage_times), 'peak_memory_bytes': self.peak_memory if self.trace_memory else None}
+
+    def to_json(self, **kwargs) -> str:
+        """The metrics as JSON text, see to_dict. Keyword arguments are passed to json.dumps."""
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def summary_lines(self) -> list[str]:
+        """The metrics as lines of debugging output."""
+        lines = [f"TOTAL NODES == {self.total_nodes}  (by depth: {', '.join([str(count) for count in self.nodes])})",
+                 f"CANDIDATES GENERATED == {self.candidates}",
+                 f"LEAVES == {self.leaves}"]
+        for name in self.checked:
+            lines.append(f"VALIDATOR {name.upper()} == checked={self.checked[name]}, rejected={self.rejected.get(name, 0)}")
+        lines.append("CONVERTER CACHE == " + ", ".join([f"{key}={self.converter_cache[key]}" for key in self.CONVERTER_CACHE_KEYS]))
+        for name, seconds in self.stage_times.items():
+            lines.append(f"STAGE {name.upper()} == {int(seconds * 100) / 100} seconds")
+        if self.trace_memory:
+            lines.append(f"PEAK MEMORY == {self.peak_memory} bytes")
+        return lines
@@ -1,7 +1,11 @@
 import argparse
+import json
 import os
 import sys
 from os import path
+from string import ascii_lowercase
+
+import pytest
 
 cwd = os.getcwd()
 if "testing" in cwd:
@@ -9,6 +13,7 @@ if "testing" in cwd:
 sys.path.append(os.getcwd())
 try:
     import make_puzzles
+    import scenarios
 except ImportError:
     raise ImportError("Could not import make_puzzles module - are you in the base project directory?")
 
@@ -109,6 +114,375 @@ def test_create_thousand_deterministic_puzzles():
     tear_down()
 
 
+def test_grid_engines_identical_output():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 1000
+    test_args.sequential = True
+    dict_puzzles = []
+    test_args.grid_engine = 'dict'
+    make_puzzles.make_puzzles(test_args, wordlist, dict_puzzles.append)
+    for grid_engine in ('bytearray', 'numpy'):
+        engine_puzzles = []
+        test_args.grid_engine = grid_engine
+        make_puzzles.make_puzzles(test_args, wordlist, engine_puzzles.append)
+        assert len(engine_puzzles) == 1000
+        assert dict_puzzles == engine_puzzles
+    tear_down()
+
+
+def test_numpy_grid_engine_falls_back_without_numpy(monkeypatch):
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 15
+    test_args.grid_engine = 'numpy'
+    monkeypatch.setattr(make_puzzles, 'np', None)
+    output_puzzles = []
+    make_puzzles.make_puzzles(test_args, wordlist, output_puzzles.append)
+    assert tuple(output_puzzles) == EXPECTED_PUZZLES_15
+    tear_down()
+
+
+@pytest.mark.skipif(make_puzzles.np is None, reason="NumPy is not installed")
+def test_vectorized_candidates_uniform_random_sample():
+    directions = tuple(make_puzzles.Direction)
+    grid_state = make_puzzles.GridState(30, 30)
+    sequential_func = make_puzzles.make_vectorized_candidates_func(directions, 30, 30, True)
+    all_candidates = sequential_func('abc', grid_state)
+    assert sequential_func('abc', grid_state, 5) == all_candidates[:5]
+    chunk_of = {c: ndx // make_puzzles.VECTORIZED_CHUNK_SIZE for ndx, c in enumerate(all_candidates)}
+    random_func = make_puzzles.make_vectorized_candidates_func(directions, 30, 30, False, rng=make_puzzles.Random(1))
+    same_chunk_count = 0
+    for _ in range(200):
+        candidates = random_func('abc', grid_state, 3)
+        assert len(set(candidates)) == 3
+        same_chunk_count += len({chunk_of[c] for c in candidates}) == 1
+    # candidates drawn from the whole table, rarely all from one chunk of it
+    assert same_chunk_count < 50
+
+
+def test_search_engines_identical_output():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 1000
+    test_args.sequential = True
+    recursive_puzzles = []
+    test_args.search_engine = 'recursive'
+    make_puzzles.make_puzzles(test_args, wordlist, recursive_puzzles.append)
+    for search_engine in ('incremental', 'iterative'):
+        engine_puzzles = []
+        test_args.search_engine = search_engine
+        make_puzzles.make_puzzles(test_args, wordlist, engine_puzzles.append)
+        assert len(engine_puzzles) == 1000
+        assert recursive_puzzles == engine_puzzles
+    tear_down()
+
+
+def test_template_rendering_identical_output(monkeypatch):
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 1000
+    test_args.sequential = True
+    for search_engine in ('recursive', 'incremental'):
+        test_args.search_engine = search_engine
+        patched_puzzles = []
+        make_puzzles.make_puzzles(test_args, wordlist, patched_puzzles.append)
+        with monkeypatch.context() as m:
+            m.setattr(make_puzzles, 'can_render_from_template', lambda *_: False)
+            rendered_puzzles = []
+            make_puzzles.make_puzzles(test_args, wordlist, rendered_puzzles.append)
+        assert len(patched_puzzles) == 1000
+        assert patched_puzzles == rendered_puzzles
+    tear_down()
+
+
+def test_most_constrained_search_finds_all_puzzles_with_fewer_nodes():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = ['one', 'two', 'three']
+    test_args.width = 5
+    test_args.height = 5
+    test_args.create_all = True
+    node_counts = {}
+    engine_puzzles = {}
+    for search_engine in ('incremental', 'most_constrained'):
+        test_args.search_engine = search_engine
+        engine_puzzles[search_engine] = []
+        metrics = make_puzzles.make_puzzles(test_args, wordlist, engine_puzzles[search_engine].append, make_puzzles.SearchMetrics())
+        node_counts[search_engine] = metrics.total_nodes
+    assert len(engine_puzzles['most_constrained']) == 46112
+    assert set(engine_puzzles['most_constrained']) == set(engine_puzzles['incremental'])
+    assert node_counts['most_constrained'] < node_counts['incremental']
+    tear_down()
+
+
+def test_forward_check_prunes_dead_branches():
+    kwargs = setup()
+    test_args = kwargs['args']
+    # rows and columns of a full 4x4 grid, where most placements of the first words leave no room for the columns
+    wordlist = ['abcd', 'efgh', 'ijkl', 'mnop', 'aeim', 'bfjn', 'cgko']
+    test_args.width = 4
+    test_args.height = 4
+    test_args.create_all = True
+    test_args.search_engine = 'incremental'
+    node_counts = {}
+    checked_puzzles = {}
+    for forward_check in (False, True):
+        test_args.forward_check = forward_check
+        checked_puzzles[forward_check] = []
+        metrics = make_puzzles.make_puzzles(test_args, wordlist, checked_puzzles[forward_check].append, make_puzzles.SearchMetrics())
+        node_counts[forward_check] = metrics.total_nodes
+    assert len(checked_puzzles[True]) == 8
+    assert checked_puzzles[True] == checked_puzzles[False]
+    assert node_counts[True] < node_counts[False]
+    assert metrics.rejected['forward_check'] == 768
+    assert make_puzzles.count_puzzles(test_args, wordlist) == 8
+    # the most constrained search drops the same dead branches without --forward_check
+    test_args.forward_check = False
+    test_args.search_engine = 'most_constrained'
+    constrained_puzzles = []
+    metrics = make_puzzles.make_puzzles(test_args, wordlist, constrained_puzzles.append, make_puzzles.SearchMetrics())
+    assert sorted(constrained_puzzles) == sorted(checked_puzzles[True])
+    assert metrics.total_nodes <= node_counts[True]
+    assert metrics.rejected['forward_check'] > 0
+    tear_down()
+
+
+def test_search_metrics_count_every_engine():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 200
+    assert make_puzzles.make_puzzles(test_args, wordlist, lambda _: None) is None
+    for search_engine in ('recursive', 'iterative', 'incremental'):
+        test_args.search_engine = search_engine
+        metrics = make_puzzles.make_puzzles(test_args, wordlist, lambda _: None, make_puzzles.SearchMetrics(trace_memory=True))
+        assert metrics.leaves == 200
+        assert metrics.nodes[-1] == 200
+        assert len(metrics.nodes) == len(wordlist)
+        validator_name = 'overlapping_words' if search_engine != 'incremental' else 'grid_state'
+        assert metrics.candidates >= metrics.checked[validator_name] > metrics.rejected[validator_name] > 0
+        exported = json.loads(metrics.to_json())
+        assert exported['nodes']['total'] == sum(metrics.nodes)
+        assert exported['peak_memory_bytes'] > 0
+        assert 'search' in exported['stage_times']
+        if search_engine != 'incremental':
+            assert metrics.converter_cache['misses'] > 0
+    # process pool tasks trace the memory of their own search
+    puzzles, _, partition_metrics = make_puzzles.search_partition(test_args, sorted(wordlist, key=len, reverse=True), 6, 6, (), 200, True, True)
+    assert len(puzzles) == partition_metrics.leaves == 200
+    assert partition_metrics.peak_memory > 0
+    tear_down()
+
+
+def test_synthetic_scenarios_are_seeded_and_searchable():
+    kwargs = setup()
+    test_args = kwargs['args']
+    # many words sharing few letters, where most crossings match
+    scenario = scenarios.make_preset_scenario('few_letters')
+    assert scenario.wordlist == scenarios.make_preset_scenario('few_letters').wordlist
+    assert scenario.wordlist != scenarios.make_preset_scenario('few_letters', seed=1).wordlist
+    assert len(set(scenario.wordlist)) == 20
+    assert set("".join(scenario.wordlist)) <= set('abc')
+    assert all([3 <= len(w) <= 6 for w in scenario.wordlist])
+    assert scenario.width == scenario.height >= 6
+    assert [len(s.wordlist) for s in scenarios.make_scaling_scenarios('product', 'count', [10, 20])] == [10, 20]
+    # only 4 distinct words can be made
+    with pytest.raises(ValueError):
+        scenarios.make_wordlist(5, 2, 2, 'ab')
+    test_args.width = scenario.width
+    test_args.height = scenario.height
+    test_args.puzzle_count = 100
+    engine_puzzles = {}
+    for search_engine in ('recursive', 'incremental', 'most_constrained'):
+        test_args.search_engine = search_engine
+        engine_puzzles[search_engine] = []
+        make_puzzles.make_puzzles(test_args, scenario.wordlist, engine_puzzles[search_engine].append)
+    assert len(engine_puzzles['recursive']) == 100
+    assert engine_puzzles['recursive'] == engine_puzzles['incremental']
+    assert len(set(engine_puzzles['most_constrained'])) == 100
+    tear_down()
+
+
+def test_unused_quota_is_handed_on_to_later_placements():
+    kwargs = setup()
+    test_args = kwargs['args']
+    # most placements of the first words leave no room for the others, only 8 puzzles exist
+    wordlist = ['abcd', 'efgh', 'ijkl', 'mnop', 'aeim', 'bfjn', 'cgko']
+    test_args.width = 4
+    test_args.height = 4
+    for search_engine in make_puzzles.SEARCH_ENGINES:
+        test_args.search_engine = search_engine
+        for puzzle_count, expected_count in ((5, 5), (8, 8), (20, 8)):
+            test_args.puzzle_count = puzzle_count
+            puzzles = []
+            make_puzzles.make_puzzles(test_args, wordlist, puzzles.append)
+            assert len(puzzles) == len(set(puzzles)) == expected_count
+    test_args.search_engine = 'recursive'
+    test_args.workers = 2
+    for partition_depth in (1, 2, 3):
+        test_args.partition_depth = partition_depth
+        for puzzle_count, expected_count in ((2, 2), (5, 5), (8, 8), (20, 8)):
+            test_args.puzzle_count = puzzle_count
+            puzzles = []
+            make_puzzles.make_puzzles(test_args, wordlist, puzzles.append)
+            assert len(puzzles) == len(set(puzzles)) == expected_count
+    # many placements of the first two words leave no room for 'aqxyz', so their subtrees hand on all of their quota
+    wordlist = ['abcde', 'fghij', 'aqxyz', 'kfmno']
+    test_args.width = 5
+    test_args.height = 5
+    for partition_depth in (2, 3):
+        test_args.partition_depth = partition_depth
+        for puzzle_count in (2, 17):
+            test_args.puzzle_count = puzzle_count
+            puzzles = []
+            make_puzzles.make_puzzles(test_args, wordlist, puzzles.append)
+            assert len(puzzles) == len(set(puzzles)) == puzzle_count
+    tear_down()
+
+
+def test_exact_puzzle_count_whenever_enough_puzzles_exist():
+    kwargs = setup()
+    test_args = kwargs['args']
+    # the last placements of some words lead to too few puzzles, so quota left over tops up the earlier placements
+    for wordlist, size, puzzle_count in ((['daced', 'ccbc', 'cee', 'ffedf', 'deead'], 5, 50), (['aaacb', 'cbedf', 'cdacc', 'ebabe', 'edfc'], 5, 50), (['fcff', 'dbbd', 'aadda', 'bab', 'bbfbf'], 5, 50), (['aca', 'bfe', 'ddd'], 3, 20)):
+        test_args.width = size
+        test_args.height = size
+        test_args.puzzle_count = puzzle_count
+        assert make_puzzles.count_puzzles(test_args, wordlist) >= puzzle_count
+        for search_engine in make_puzzles.SEARCH_ENGINES:
+            test_args.search_engine = search_engine
+            for sequential in (True, False):
+                test_args.sequential = sequential
+                puzzles = []
+                make_puzzles.make_puzzles(test_args, wordlist, puzzles.append)
+                assert len(puzzles) == puzzle_count
+        test_args.search_engine = 'recursive'
+        test_args.sequential = True
+        test_args.workers = 2
+        test_args.partition_depth = 2
+        puzzles = []
+        make_puzzles.make_puzzles(test_args, wordlist, puzzles.append)
+        assert len(puzzles) == puzzle_count
+        test_args.workers = 1
+    tear_down()
+
+
+def test_iterative_search_pause_and_resume():
+    kwargs = setup()
+    wordlist = sorted(kwargs['wordlist'], key=len, reverse=True)
+    directions = tuple(make_puzzles.Direction)
+    converter = make_puzzles.data_converters.make_word_placement_to_char_position_converter(6, 6, wordlist)
+    generator_factory = make_puzzles.make_candidates_generator_factory(directions, 6, 6, True)
+    candidates_func = make_puzzles.partial(make_puzzles.find_word_candidates, validators=(make_puzzles.make_validator_check_overlapping_words(converter),), generator_factory=generator_factory)
+    leaves = []
+    search = make_puzzles.iterate_update_linked_list(make_puzzles.LinkedListItemSingleLink(make_puzzles.END_NODE, None), 0, wordlist, candidates_func, converter, leaves.extend, 15)
+    for _ in range(3):
+        next(search)
+    paused_count = len(leaves)
+    assert paused_count < 15
+    for _ in search:
+        pass
+    assert len(leaves) == 15
+
+
+def test_worker_pool_identical_sequential_output():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 1000
+    test_args.sequential = True
+    single_process_puzzles = []
+    make_puzzles.make_puzzles(test_args, wordlist, single_process_puzzles.append)
+    test_args.workers = 2
+    for partition_depth in (1, 2):
+        test_args.partition_depth = partition_depth
+        pool_puzzles = []
+        make_puzzles.make_puzzles(test_args, wordlist, pool_puzzles.append)
+        assert pool_puzzles == single_process_puzzles
+    # wordlists with dead branches, where quota is handed on between the partitions
+    for wordlist, size, puzzle_counts in ((['abcd', 'efgh', 'ijkl', 'aeix'], 4, (3, 5, 30)), (['abcde', 'fghij', 'aqxyz', 'kfmno'], 5, (17, 100))):
+        test_args.width = size
+        test_args.height = size
+        for puzzle_count in puzzle_counts:
+            test_args.puzzle_count = puzzle_count
+            test_args.workers = 1
+            single_process_puzzles = []
+            make_puzzles.make_puzzles(test_args, wordlist, single_process_puzzles.append)
+            test_args.workers = 2
+            for partition_depth in (1, 2, 3):
+                test_args.partition_depth = partition_depth
+                pool_puzzles = []
+                metrics = make_puzzles.make_puzzles(test_args, wordlist, pool_puzzles.append, make_puzzles.SearchMetrics())
+                assert pool_puzzles == single_process_puzzles
+                # partitions searched again with more quota are only counted once
+                assert metrics.leaves == len(pool_puzzles)
+    tear_down()
+
+
+def test_placement_table_matches_grouped_items():
+    directions = tuple(make_puzzles.Direction)
+    table = make_puzzles.make_placement_table(5, directions, 6, 7)
+    flat = [((start % 6, start // 6), directions[ndx]) for start, ndx in zip(table.starts, table.direction_ndx)]
+    grouped = [(position, d) for position, cell_directions in table.items for d in cell_directions]
+    assert flat == grouped
+    assert len(table) == 2 * (6 * 3 + 2 * 7) + 4 * (2 * 3)
+    placement_tables = {}
+    assert make_puzzles.get_placement_table(placement_tables, 5, directions, 6, 7) is make_puzzles.get_placement_table(placement_tables, 5, directions, 6, 7)
+
+
+def test_converter_cache_is_bounded_lru():
+    Direction = make_puzzles.Direction
+    converter = make_puzzles.data_converters.make_word_placement_to_char_position_converter(4, 4, ['ab', 'ba'], cache_size=2)
+    assert converter(((0, 0), Direction.RIGHT, 'ab')) == {(0, 0): 'a', (1, 0): 'b'}
+    assert converter(((0, 0), Direction.RIGHT, 'ba')) == {(0, 0): 'b', (1, 0): 'a'}
+    converter(((0, 0), Direction.RIGHT, 'ab'))
+    # the least recently used placement is evicted, so 'ab' stays cached
+    assert converter(((1, 1), Direction.DOWN, 'ab')) == {(1, 1): 'a', (1, 2): 'b'}
+    converter(((0, 0), Direction.RIGHT, 'ab'))
+    assert converter.cache_info() == {'hits': 2, 'misses': 3, 'evictions': 1, 'size': 2, 'max_size': 2}
+
+
+def test_make_puzzles_iter_yields_on_demand():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 1000
+    test_args.sequential = True
+    puzzles = make_puzzles.make_puzzles_iter(test_args, wordlist)
+    first_puzzles = [next(puzzles) for _ in range(12)]
+    puzzles.close()
+    for ndx, puzzle in EXPECTED_PUZZLES_1000[:3]:
+        assert puzzle == first_puzzles[ndx]
+    first_grid = next(make_puzzles.make_puzzles_iter(test_args, wordlist, as_grid=True))
+    assert ",".join(["".join(row) for row in first_grid]) + ";" == EXPECTED_PUZZLES_1000[0][1]
+    test_args.puzzle_count = 15
+    assert tuple(make_puzzles.make_puzzles_iter(test_args, wordlist)) == EXPECTED_PUZZLES_15
+    test_args.unique_up_to_symmetry = True
+    test_args.expand_symmetric = True
+    test_args.forward_check = True
+    expected_puzzles = []
+    make_puzzles.make_puzzles(test_args, wordlist, expected_puzzles.append)
+    assert len(expected_puzzles) > 15
+    assert list(make_puzzles.make_puzzles_iter(test_args, wordlist)) == expected_puzzles
+    grids = make_puzzles.make_puzzles_iter(test_args, wordlist, as_grid=True)
+    assert [",".join(["".join(row) for row in grid]) + ";" for grid in grids] == expected_puzzles
+    # forward checking removes the placements which leave a later word no room
+    wordlist = ['abcd', 'efgh', 'ijkl', 'mnop', 'aeim', 'bfjn', 'cgko']
+    test_args.width = 4
+    test_args.height = 4
+    test_args.create_all = True
+    test_args.unique_up_to_symmetry = False
+    metrics = make_puzzles.SearchMetrics()
+    assert len(list(make_puzzles.make_puzzles_iter(test_args, wordlist, metrics=metrics))) == 8
+    assert metrics.rejected['forward_check'] > 0
+    tear_down()
+
+
 def test_create_hundred_random_puzzles():
     kwargs = setup()
     test_args = kwargs['args']
@@ -121,6 +495,48 @@ def test_create_hundred_random_puzzles():
     tear_down()
 
 
+def test_seeded_random_puzzles_are_repeatable():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 200
+    test_args.sequential = False
+    test_args.grid_engine = 'bytearray'
+    outputs = []
+    for seed in (42, 42, 7):
+        test_args.seed = seed
+        output_puzzles = []
+        make_puzzles.make_puzzles(test_args, wordlist, output_puzzles.append)
+        assert len(output_puzzles) == 200
+        outputs.append(output_puzzles)
+    assert outputs[0] == outputs[1]
+    assert outputs[0] != outputs[2]
+    tear_down()
+
+
+def test_complete_grids_are_filled_with_seeded_letters():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = kwargs['wordlist']
+    test_args.puzzle_count = 100
+    incomplete_puzzles = []
+    make_puzzles.make_puzzles(test_args, wordlist, incomplete_puzzles.append)
+    test_args.incomplete = False
+    outputs = []
+    for search_engine, seed in (('recursive', 3), ('incremental', 3), ('recursive', 4)):
+        test_args.search_engine = search_engine
+        test_args.seed = seed
+        output_puzzles = []
+        make_puzzles.make_puzzles(test_args, wordlist, output_puzzles.append)
+        for incomplete, complete in zip(incomplete_puzzles, output_puzzles):
+            assert len(incomplete) == len(complete)
+            assert all([a == b if a != '*' else b in ascii_lowercase for a, b in zip(incomplete, complete)])
+        outputs.append(output_puzzles)
+    assert outputs[0] == outputs[1]
+    assert outputs[0] != outputs[2]
+    tear_down()
+
+
 def test_create_5000_random_puzzles():
     kwargs = setup()
     mock_writer = MockProcessManager()
@@ -184,6 +600,101 @@ if LONG_TESTS:
         tear_down()
 
 
+def test_count_puzzles_matches_create_all():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = ['one', 'two', 'three']
+    test_args.width = 5
+    test_args.height = 5
+    test_args.create_all = True
+    mock_writer = MockProcessManager()
+    make_puzzles.make_puzzles(test_args, wordlist, mock_writer.add)
+    assert make_puzzles.count_puzzles(test_args, wordlist) == mock_writer.count == 46112
+    test_args.memoize = True
+    assert make_puzzles.count_puzzles(test_args, wordlist) == 46112
+    tear_down()
+
+
+
+def test_unique_up_to_symmetry_finds_one_puzzle_per_orbit():
+    kwargs = setup()
+    test_args = kwargs['args']
+    wordlist = ['one', 'two', 'three']
+    test_args.width = 5
+    test_args.height = 5
+    test_args.create_all = True
+    all_puzzles = []
+    make_puzzles.make_puzzles(test_args, wordlist, all_puzzles.append)
+    orbits = {min(make_puzzles.data_converters.symmetric_puzzle_variants(p, 5, 5)) for p in all_puzzles}
+    test_args.unique_up_to_symmetry = True
+    for grid_engine, search_engine in (('dict', 'recursive'), ('bytearray', 'incremental'), ('numpy', 'iterative')):
+        test_args.grid_engine = grid_engine
+        test_args.search_engine = search_engine
+        unique_puzzles = []
+        make_puzzles.make_puzzles(test_args, wordlist, unique_puzzles.append)
+        assert len(unique_puzzles) == len(orbits) == 5764
+        assert {min(make_puzzles.data_converters.symmetric_puzzle_variants(p, 5, 5)) for p in unique_puzzles} == orbits
+    assert make_puzzles.count_puzzles(test_args, wordlist) == 5764
+    test_args.expand_symmetric = True
+    expanded_puzzles = []
+    make_puzzles.make_puzzles(test_args, wordlist, expanded_puzzles.append)
+    assert sorted(expanded_puzzles) == sorted(all_puzzles)
+    tear_down()
+
+
+if LONG_TESTS:
+    def test_count_all_puzzles():
+        kwargs = setup()
+        assert make_puzzles.count_puzzles(kwargs['args'], kwargs['wordlist']) == 14435776
+
+
+def test_writer_process_batches_all_items(tmp_path):
+    output_filename = str(tmp_path / "output.txt")
+    writer = make_puzzles.WriterProcessManager(output_filename, mode='w', batch_size=100)
+    items = [f"puzzle{i};" for i in range(1050)]
+    for item in items:
+        writer.add(item)
+    metrics = writer.halt()
+    with open(output_filename) as fp:
+        assert fp.read() == "".join(items)
+    assert metrics['items_written'] == 1050
+    assert metrics['bytes_written'] == len("".join(items))
+    assert metrics['batches_sent'] == 11
+    binary_filename = str(tmp_path / "output.bin")
+    writer = make_puzzles.WriterProcessManager(binary_filename, mode='w', batch_size=4, binary=True)
+    encoder = make_puzzles.puzzle_files.BinaryPuzzleEncoder(writer.add, ['one', 'two', 'three', 'full'], '*', writer.add_header)
+    for puzzle in EXPECTED_PUZZLES_15:
+        encoder(puzzle)
+    metrics = writer.halt()
+    with make_puzzles.puzzle_files.BinaryPuzzleReader(binary_filename) as reader:
+        assert tuple(reader[i] for i in range(len(reader))) == EXPECTED_PUZZLES_15
+    # the header is not counted as a puzzle
+    assert metrics['items_written'] == 15
+    assert metrics['bytes_written'] + metrics['header_bytes_written'] == path.getsize(binary_filename)
+
+
+def test_binary_puzzle_file_random_access(tmp_path):
+    text_filename = str(tmp_path / "output.txt")
+    binary_filename = str(tmp_path / "output.bin")
+    with open(text_filename, "w") as fp:
+        fp.write("".join(EXPECTED_PUZZLES_15))
+    wordlist = ['one', 'two', 'three', 'full']
+    assert make_puzzles.puzzle_files.text_to_binary(text_filename, binary_filename, wordlist) == 15
+    assert path.getsize(binary_filename) < path.getsize(text_filename)
+    with make_puzzles.puzzle_files.BinaryPuzzleReader(binary_filename) as reader:
+        assert (reader.width, reader.height, reader.wordlist, reader.placeholder) == (6, 6, wordlist, '*')
+        assert len(reader) == 15
+        assert reader[11] == EXPECTED_PUZZLES_15[11]
+        assert reader[-1] == EXPECTED_PUZZLES_15[-1]
+    make_puzzles.puzzle_files.binary_to_text(binary_filename, text_filename)
+    with open(text_filename) as fp:
+        assert fp.read() == "".join(EXPECTED_PUZZLES_15)
+    make_puzzles.puzzle_files.check_wordlist(wordlist, '*')
+    for bad_wordlist, bad_placeholder in ((['One', 'two'], '*'), (['one', 'two'], 'a'), (['one', 'two'], '**')):
+        with pytest.raises(ValueError):
+            make_puzzles.puzzle_files.check_wordlist(bad_wordlist, bad_placeholder)
+
+
 def test_create_complex_puzzles():
     first_puzzle = "pheasantsparrowf,kvcplwrm*eagleaa,heuhebaaacaowl*n,*asliaalvgrgc**t,**wttcctlepou**a,***krukoroniwl*i,*****erecow*e*ll,******lenks*****,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************"
     last_puzzle = "albatroswallowfk,vulturepfowleape,c*mh*aravenanhes,*haag*lrc*gte*at,*wiugc*r*laa**cr,k*lcopooeis***oe,*l*nkwiwla****cl,*****e*en*****k*,******nt********,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************,****************"